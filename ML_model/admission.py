@@ -0,0 +1,175 @@
+"""
+Admission Control
+In-process guards for the expensive endpoints:
+
+- per-endpoint request-size limits (413), always on
+- token-bucket rate limits per client per endpoint (429 + Retry-After),
+  enabled with RATE_LIMITS=1
+- a global cap on concurrent OCR jobs (503 + Retry-After), enabled by
+  setting OCR_MAX_CONCURRENCY above 0
+
+Clients are identified by X-API-Key when the key is listed in API_KEYS,
+otherwise by IP address (the first X-Forwarded-For hop when TRUST_PROXY=1).
+A caller with a listed key (the Node backend) can name the tenant it is
+acting for in X-Client-Id, so tenants behind one backend get separate
+buckets. Unknown keys fall back to the IP, so rotating keys does not dodge
+limits.
+
+Counters of admitted vs rejected requests are kept per endpoint and
+exposed through snapshot().
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+API_KEYS = {key.strip() for key in os.environ.get('API_KEYS', '').split(',') if key.strip()}
+TRUST_PROXY = os.environ.get('TRUST_PROXY', '0') == '1'
+RATE_LIMITS = os.environ.get('RATE_LIMITS', '0') == '1'
+# 0 = no cap
+OCR_MAX_CONCURRENCY = int(os.environ.get('OCR_MAX_CONCURRENCY', 0))
+# Buckets idle long enough to be full again are dropped past this many
+MAX_TRACKED_BUCKETS = 10000
+
+MB = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class Policy:
+    rate: float            # tokens added per second
+    burst: float           # bucket capacity
+    max_bytes: int         # largest accepted request body
+    ocr: bool = False      # counts against the global OCR concurrency cap
+
+
+# Keyed by route endpoint name (Flask's request.endpoint / the ASGI handler name)
+POLICIES = {
+    'extract_license': Policy(rate=float(os.environ.get('OCR_RATE_PER_MIN', 6)) / 60, burst=3,
+                              max_bytes=10 * MB, ocr=True),
+    'predict': Policy(rate=20, burst=40, max_bytes=64 * 1024),
+    'predict_batch': Policy(rate=1, burst=5, max_bytes=8 * MB),
+    'explain_readings': Policy(rate=2, burst=5, max_bytes=8 * MB),
+    'similar': Policy(rate=5, burst=10, max_bytes=2 * MB),
+    'expiry_bulk': Policy(rate=0.5, burst=2, max_bytes=32 * MB),
+    'rebuild_similar_index': Policy(rate=1 / 60, burst=1, max_bytes=1024),
+}
+
+# Largest body any route accepts (use for MAX_CONTENT_LENGTH)
+MAX_REQUEST_BYTES = max(policy.max_bytes for policy in POLICIES.values())
+
+
+@dataclass
+class Decision:
+    admitted: bool
+    status: int = 200
+    error: str = None
+    retry_after: int = None
+    release: object = None   # call once the request finishes (OCR slot)
+
+
+def has_api_key(headers):
+    """True when the request carries a key listed in API_KEYS"""
+    return headers.get('X-API-Key') in API_KEYS
+
+
+def client_identity(headers, remote_addr):
+    """Stable client key from an API key header or the caller's IP"""
+    api_key = headers.get('X-API-Key')
+    if api_key and api_key in API_KEYS:
+        tenant = headers.get('X-Client-Id')
+        return f"key:{api_key}:{tenant}" if tenant else f"key:{api_key}"
+    if TRUST_PROXY:
+        forwarded = headers.get('X-Forwarded-For')
+        if forwarded:
+            return f"ip:{forwarded.split(',')[0].strip()}"
+    return f"ip:{remote_addr}"
+
+
+class AdmissionController:
+    """Token buckets, an OCR semaphore and counters behind one lock"""
+
+    def __init__(self, policies=POLICIES, ocr_max_concurrency=OCR_MAX_CONCURRENCY, rate_limits=RATE_LIMITS):
+        self.policies = policies
+        self.ocr_max_concurrency = ocr_max_concurrency
+        self.rate_limits = rate_limits
+        self._lock = threading.Lock()
+        self._buckets = {}              # (client, endpoint) -> [tokens, last_refill]
+        self._ocr_in_flight = 0
+        self._counters = defaultdict(int)   # (endpoint, outcome) -> count
+
+    def _take_token(self, key, policy, now):
+        """Refill lazily and take one token; returns seconds to wait if empty"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_BUCKETS:
+                self._prune(now)
+            bucket = self._buckets[key] = [policy.burst, now]
+        tokens = min(policy.burst, bucket[0] + (now - bucket[1]) * policy.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / policy.rate
+
+    def _prune(self, now):
+        for key, (tokens, last) in list(self._buckets.items()):
+            policy = self.policies[key[1]]
+            if tokens + (now - last) * policy.rate >= policy.burst:
+                del self._buckets[key]
+
+    def _release_ocr(self):
+        with self._lock:
+            self._ocr_in_flight -= 1
+
+    def admit(self, endpoint, client, content_length=None):
+        """Decide whether to run a request; call decision.release() when done if set"""
+        policy = self.policies.get(endpoint)
+        if policy is None:
+            return Decision(True)
+
+        with self._lock:
+            if content_length is not None and content_length > policy.max_bytes:
+                self._counters[(endpoint, 'too_large')] += 1
+                return Decision(False, 413, f"Request body exceeds {policy.max_bytes // 1024} KB limit")
+
+            # Capacity is checked before the bucket so a busy rejection costs no token
+            if policy.ocr and 0 < self.ocr_max_concurrency <= self._ocr_in_flight:
+                self._counters[(endpoint, 'over_capacity')] += 1
+                return Decision(False, 503, 'OCR service is busy, try again shortly', retry_after=2)
+
+            wait = self._take_token((client, endpoint), policy, time.monotonic()) if self.rate_limits else 0.0
+            if wait > 0:
+                self._counters[(endpoint, 'rate_limited')] += 1
+                return Decision(False, 429, 'Rate limit exceeded, slow down', retry_after=max(1, round(wait)))
+
+            release = None
+            if policy.ocr:
+                self._ocr_in_flight += 1
+                release = self._release_ocr
+
+            self._counters[(endpoint, 'admitted')] += 1
+            return Decision(True, release=release)
+
+    def record(self, endpoint, outcome):
+        """Count a rejection made outside admit(), e.g. a chunked body found too large while reading"""
+        with self._lock:
+            self._counters[(endpoint, outcome)] += 1
+
+    def snapshot(self):
+        """Admitted/rejected counts per endpoint plus current OCR load"""
+        with self._lock:
+            endpoints = {}
+            for (endpoint, outcome), count in self._counters.items():
+                endpoints.setdefault(endpoint, {
+                    'admitted': 0, 'rate_limited': 0, 'too_large': 0, 'over_capacity': 0
+                })[outcome] = count
+            return {
+                'endpoints': endpoints,
+                'ocr_in_flight': self._ocr_in_flight,
+                'ocr_max_concurrency': self.ocr_max_concurrency,
+                'rate_limits': self.rate_limits,
+                'tracked_clients': len(self._buckets),
+            }
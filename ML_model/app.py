@@ -1,14 +1,25 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, g
 from flask_cors import CORS
 import joblib
 import numpy as np
 import pandas as pd
 import re
+import io
 import os
-import tempfile
+import json
+import hashlib
+import threading
 from PIL import Image
 import cv2
 
+import admission
+import cache
+import model_registry
+import serialization
+from explanations import explain
+from expiry_index import DATE_PATTERN, TN_FORMAT_PATTERN, ExpiryIndex, parse_expiry_dates
+from similarity_index import IndexNotReady, SimilarityIndex
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Lazy OCR initialization to avoid startup crashes/timeouts during deploy
@@ -39,17 +50,253 @@ def get_ocr_reader():
         raise RuntimeError(ocr_init_error)
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+app.json = serialization.FastJSONProvider(app)
+app.config['MAX_CONTENT_LENGTH'] = admission.MAX_REQUEST_BYTES
+
+# Comma-separated allowed origins; "*" keeps the previous allow-all behaviour
+CORS_ORIGINS = [origin.strip() for origin in os.environ.get('CORS_ORIGINS', '*').split(',') if origin.strip()]
+CORS(app, origins=CORS_ORIGINS)
+
+admission_control = admission.AdmissionController()
+
+
+def rejection_response(decision):
+    """JSON error for a request turned away by admission control"""
+    response = jsonify({'success': False, 'error': decision.error})
+    response.status_code = decision.status
+    if decision.retry_after:
+        response.headers['Retry-After'] = str(decision.retry_after)
+    return response
+
+
+@app.before_request
+def admit_request():
+    """Apply rate limits, size limits and the OCR concurrency cap"""
+    client = admission.client_identity(request.headers, request.remote_addr)
+    decision = admission_control.admit(request.endpoint, client, request.content_length)
+    if not decision.admitted:
+        return rejection_response(decision)
+    g.admission_release = decision.release
+
+
+@app.teardown_request
+def release_admission(error=None):
+    release = g.pop('admission_release', None)
+    if release is not None:
+        release()
+
+
+@app.errorhandler(413)
+def request_too_large(error):
+    return jsonify({'success': False, 'error': 'Request body too large'}), 413
 
 # Load the trained models
+model = None
+feature_importance = None
+model_version = None
+_model_manifest_mtime = None
+_model_lock = threading.Lock()
+
+
+def load_models():
+    """Load the latest published model version, falling back to the bundled pickles"""
+    global model, feature_importance, model_version, _model_manifest_mtime
+
+    mtime = model_registry.manifest_mtime()
+    try:
+        if mtime is not None:
+            new_model, new_importance, manifest = model_registry.load_latest()
+            new_version = manifest["version"]
+        else:
+            new_model = joblib.load(os.path.join(BASE_DIR, "engine_health_model.pkl"))
+            new_importance = joblib.load(os.path.join(BASE_DIR, "feature_importance.pkl"))
+            new_version = None
+    except Exception as error:
+        print(f"[MODEL] Failed to load model files: {error}")
+        _model_manifest_mtime = mtime
+        return
+
+    model, feature_importance, model_version = new_model, new_importance, new_version
+    _model_manifest_mtime = mtime
+    print(f"[MODEL] Loaded engine model version: {model_version or 'bundled'}")
+
+
+def refresh_model_if_updated():
+    """Reload the model when the registry manifest has changed (one stat per call)"""
+    if model_registry.manifest_mtime() == _model_manifest_mtime:
+        return
+    with _model_lock:
+        if model_registry.manifest_mtime() != _model_manifest_mtime:
+            load_models()
+
+
+load_models()
+
+# Prediction / OCR response cache (CACHE_BACKEND: memory, sqlite, redis or none)
 try:
-    model = joblib.load(os.path.join(BASE_DIR, "engine_health_model.pkl"))
-    feature_importance = joblib.load(os.path.join(BASE_DIR, "feature_importance.pkl"))
+    response_cache = cache.create_cache()
 except Exception as error:
-    print(f"[MODEL] Failed to load model files: {error}")
-    model = None
-    feature_importance = None
+    print(f"[CACHE] {error}; falling back to the in-process cache")
+    response_cache = cache.MemoryCache()
+PREDICTION_CACHE_TTL = int(os.environ.get('PREDICTION_CACHE_TTL', 300))
+OCR_CACHE_TTL = int(os.environ.get('OCR_CACHE_TTL', 24 * 3600))
+
+FALSE_FLAGS = ('', '0', 'false', 'no', 'off')
+
+
+def parse_flag(value, default=False):
+    """Query-string or JSON flag: missing -> default, "0"/"false"/"no"/"off" -> False"""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() not in FALSE_FLAGS
+    return bool(value)
+
 
+# Model feature columns and the matching request keys, in the same order
+FEATURE_NAMES = ['Engine rpm', 'Lub oil pressure', 'Fuel pressure', 'Coolant pressure', 'lub oil temp', 'Coolant temp']
+PARAM_KEYS = ['rpm', 'oil_pressure', 'fuel_pressure', 'coolant_pressure', 'oil_temp', 'coolant_temp']
+
+
+def parse_readings(data):
+    """Accept one reading or {"readings": [...]} and return an (n, 6) float array"""
+    readings = data.get('readings', [data])
+    if not isinstance(readings, list) or not readings:
+        raise ValueError("'readings' must be a non-empty list")
+    return np.array([[float(r.get(key, 0)) for key in PARAM_KEYS] for r in readings], dtype=np.float64)
+
+
+# Every issue analyze_parameters() can report, keyed by a stable code.
+# Compact responses send only the code; clients fetch the text once from
+# /issues/dictionary.
+SEVERITY_STYLE = {
+    "CRITICAL": {"icon": "🔴", "color": "#dc3545"},
+    "HIGH": {"icon": "🟠", "color": "#fd7e14"},
+    "MEDIUM": {"icon": "🟡", "color": "#ffc107"},
+    "LOW": {"icon": "🟢", "color": "#28a745"},
+}
+
+ISSUE_CATALOG = {
+    "OIL_PRESSURE_NONE": {
+        "severity": "CRITICAL",
+        "issue": "No Oil Pressure Detected",
+        "remedy": "STOP ENGINE IMMEDIATELY! Complete oil pressure loss. Check oil level, oil pump failure, or sensor malfunction"
+    },
+    "OIL_PRESSURE_CRITICAL_LOW": {
+        "severity": "CRITICAL",
+        "issue": "Extremely Low Oil Pressure",
+        "remedy": "STOP ENGINE IMMEDIATELY! Check for oil leaks, inspect oil pump, verify oil level"
+    },
+    "OIL_PRESSURE_LOW": {
+        "severity": "HIGH",
+        "issue": "Low Oil Pressure",
+        "remedy": "Refill engine oil, check oil filter, inspect oil pump condition"
+    },
+    "OIL_TEMP_CRITICAL_HIGH": {
+        "severity": "CRITICAL",
+        "issue": "Critical Oil Temperature",
+        "remedy": "STOP ENGINE! Replace oil immediately, check oil cooler, inspect lubrication system"
+    },
+    "OIL_TEMP_HIGH": {
+        "severity": "HIGH",
+        "issue": "High Oil Temperature",
+        "remedy": "Change oil and filter, check oil cooler efficiency, reduce engine load"
+    },
+    "OIL_TEMP_CRITICAL_LOW": {
+        "severity": "CRITICAL",
+        "issue": "Abnormally Low Oil Temperature",
+        "remedy": "Possible sensor failure or engine not running. Check oil temperature sensor and wiring"
+    },
+    "OIL_TEMP_LOW": {
+        "severity": "MEDIUM",
+        "issue": "Low Oil Temperature",
+        "remedy": "Allow proper warm-up time, check thermostat operation"
+    },
+    "COOLANT_TEMP_CRITICAL_HIGH": {
+        "severity": "CRITICAL",
+        "issue": "Engine Overheating",
+        "remedy": "STOP ENGINE! Check radiator, inspect water pump, verify coolant level and quality"
+    },
+    "COOLANT_TEMP_HIGH": {
+        "severity": "HIGH",
+        "issue": "High Coolant Temperature",
+        "remedy": "Flush and replace coolant, check radiator fans, inspect thermostat"
+    },
+    "COOLANT_TEMP_CRITICAL_LOW": {
+        "severity": "CRITICAL",
+        "issue": "Abnormally Low Coolant Temperature",
+        "remedy": "Possible sensor failure or thermostat stuck open. Check coolant temperature sensor and thermostat"
+    },
+    "COOLANT_TEMP_LOW": {
+        "severity": "MEDIUM",
+        "issue": "Low Coolant Temperature",
+        "remedy": "Allow engine to warm up properly, check thermostat operation, verify heater function"
+    },
+    "COOLANT_PRESSURE_LOW": {
+        "severity": "HIGH",
+        "issue": "Low Coolant Pressure",
+        "remedy": "Check for coolant leaks, inspect radiator cap, verify water pump operation"
+    },
+    "COOLANT_PRESSURE_HIGH": {
+        "severity": "MEDIUM",
+        "issue": "High Coolant Pressure",
+        "remedy": "Inspect cooling system for blockages, check radiator cap rating"
+    },
+    "FUEL_PRESSURE_NONE": {
+        "severity": "CRITICAL",
+        "issue": "No Fuel Pressure Detected",
+        "remedy": "Engine cannot run without fuel pressure. Check fuel pump, fuel tank level, and fuel lines"
+    },
+    "FUEL_PRESSURE_VERY_LOW": {
+        "severity": "HIGH",
+        "issue": "Very Low Fuel Pressure",
+        "remedy": "Check fuel pump, replace fuel filter, inspect fuel lines for blockages"
+    },
+    "FUEL_PRESSURE_LOW": {
+        "severity": "MEDIUM",
+        "issue": "Low Fuel Pressure",
+        "remedy": "Replace fuel filter, check fuel pump performance, verify fuel quality"
+    },
+    "RPM_EXCESSIVE": {
+        "severity": "HIGH",
+        "issue": "Excessive Engine RPM",
+        "remedy": "Reduce engine load immediately, check throttle control, avoid over-revving"
+    },
+    "RPM_HIGH": {
+        "severity": "MEDIUM",
+        "issue": "High Engine RPM",
+        "remedy": "Reduce load, optimize driving habits, shift to higher gear if applicable"
+    },
+    "RPM_CRITICAL_LOW": {
+        "severity": "CRITICAL",
+        "issue": "Critically Low RPM / Engine Stall Risk",
+        "remedy": "Engine may not be running or about to stall. Check ignition system, fuel supply, and idle control valve"
+    },
+    "RPM_VERY_LOW": {
+        "severity": "MEDIUM",
+        "issue": "Very Low RPM",
+        "remedy": "Check idle speed adjustment, inspect throttle body, verify air intake"
+    },
+}
+
+
+# Changes whenever the catalog text changes, so clients can cache it safely
+ISSUE_DICTIONARY_VERSION = hashlib.sha1(json.dumps([SEVERITY_STYLE, ISSUE_CATALOG], sort_keys=True).encode()).hexdigest()[:12]
+
+
+def _issue(code, value):
+    """Full issue dict for a catalog code"""
+    entry = ISSUE_CATALOG[code]
+    style = SEVERITY_STYLE[entry["severity"]]
+    return {
+        "code": code,
+        "severity": entry["severity"],
+        "icon": style["icon"],
+        "issue": entry["issue"],
+        "value": value,
+        "remedy": entry["remedy"],
+        "color": style["color"]
+    }
 
 
 def analyze_parameters(data):
@@ -59,195 +306,55 @@ def analyze_parameters(data):
     
     # Oil Pressure Analysis
     if oil_p <= 0:
-        issues.append({
-            "severity": "CRITICAL",
-            "icon": "🔴",
-            "issue": "No Oil Pressure Detected",
-            "value": f"{oil_p:.2f} bar",
-            "remedy": "STOP ENGINE IMMEDIATELY! Complete oil pressure loss. Check oil level, oil pump failure, or sensor malfunction",
-            "color": "#dc3545"
-        })
+        issues.append(_issue("OIL_PRESSURE_NONE", f"{oil_p:.2f} bar"))
     elif oil_p < 1.5:
-        issues.append({
-            "severity": "CRITICAL",
-            "icon": "🔴",
-            "issue": "Extremely Low Oil Pressure",
-            "value": f"{oil_p:.2f} bar",
-            "remedy": "STOP ENGINE IMMEDIATELY! Check for oil leaks, inspect oil pump, verify oil level",
-            "color": "#dc3545"
-        })
+        issues.append(_issue("OIL_PRESSURE_CRITICAL_LOW", f"{oil_p:.2f} bar"))
     elif oil_p < 2.5:
-        issues.append({
-            "severity": "HIGH",
-            "icon": "🟠",
-            "issue": "Low Oil Pressure",
-            "value": f"{oil_p:.2f} bar",
-            "remedy": "Refill engine oil, check oil filter, inspect oil pump condition",
-            "color": "#fd7e14"
-        })
+        issues.append(_issue("OIL_PRESSURE_LOW", f"{oil_p:.2f} bar"))
     
     # Oil Temperature Analysis
     if oil_t > 100:
-        issues.append({
-            "severity": "CRITICAL",
-            "icon": "🔴",
-            "issue": "Critical Oil Temperature",
-            "value": f"{oil_t:.1f}°C",
-            "remedy": "STOP ENGINE! Replace oil immediately, check oil cooler, inspect lubrication system",
-            "color": "#dc3545"
-        })
+        issues.append(_issue("OIL_TEMP_CRITICAL_HIGH", f"{oil_t:.1f}°C"))
     elif oil_t > 90:
-        issues.append({
-            "severity": "HIGH",
-            "icon": "🟠",
-            "issue": "High Oil Temperature",
-            "value": f"{oil_t:.1f}°C",
-            "remedy": "Change oil and filter, check oil cooler efficiency, reduce engine load",
-            "color": "#fd7e14"
-        })
+        issues.append(_issue("OIL_TEMP_HIGH", f"{oil_t:.1f}°C"))
     elif oil_t < 40:
-        issues.append({
-            "severity": "CRITICAL",
-            "icon": "🔴",
-            "issue": "Abnormally Low Oil Temperature",
-            "value": f"{oil_t:.1f}°C",
-            "remedy": "Possible sensor failure or engine not running. Check oil temperature sensor and wiring",
-            "color": "#dc3545"
-        })
+        issues.append(_issue("OIL_TEMP_CRITICAL_LOW", f"{oil_t:.1f}°C"))
     elif oil_t < 60:
-        issues.append({
-            "severity": "MEDIUM",
-            "icon": "🟡",
-            "issue": "Low Oil Temperature",
-            "value": f"{oil_t:.1f}°C",
-            "remedy": "Allow proper warm-up time, check thermostat operation",
-            "color": "#ffc107"
-        })
+        issues.append(_issue("OIL_TEMP_LOW", f"{oil_t:.1f}°C"))
     
     # Coolant Temperature Analysis
     if cool_t > 100:
-        issues.append({
-            "severity": "CRITICAL",
-            "icon": "🔴",
-            "issue": "Engine Overheating",
-            "value": f"{cool_t:.1f}°C",
-            "remedy": "STOP ENGINE! Check radiator, inspect water pump, verify coolant level and quality",
-            "color": "#dc3545"
-        })
+        issues.append(_issue("COOLANT_TEMP_CRITICAL_HIGH", f"{cool_t:.1f}°C"))
     elif cool_t > 90:
-        issues.append({
-            "severity": "HIGH",
-            "icon": "🟠",
-            "issue": "High Coolant Temperature",
-            "value": f"{cool_t:.1f}°C",
-            "remedy": "Flush and replace coolant, check radiator fans, inspect thermostat",
-            "color": "#fd7e14"
-        })
+        issues.append(_issue("COOLANT_TEMP_HIGH", f"{cool_t:.1f}°C"))
     elif cool_t < 40:
-        issues.append({
-            "severity": "CRITICAL",
-            "icon": "🔴",
-            "issue": "Abnormally Low Coolant Temperature",
-            "value": f"{cool_t:.1f}°C",
-            "remedy": "Possible sensor failure or thermostat stuck open. Check coolant temperature sensor and thermostat",
-            "color": "#dc3545"
-        })
+        issues.append(_issue("COOLANT_TEMP_CRITICAL_LOW", f"{cool_t:.1f}°C"))
     elif cool_t < 60:
-        issues.append({
-            "severity": "MEDIUM",
-            "icon": "🟡",
-            "issue": "Low Coolant Temperature",
-            "value": f"{cool_t:.1f}°C",
-            "remedy": "Allow engine to warm up properly, check thermostat operation, verify heater function",
-            "color": "#ffc107"
-        })
+        issues.append(_issue("COOLANT_TEMP_LOW", f"{cool_t:.1f}°C"))
     
     # Coolant Pressure Analysis
     if cool_p < 1.0:
-        issues.append({
-            "severity": "HIGH",
-            "icon": "🟠",
-            "issue": "Low Coolant Pressure",
-            "value": f"{cool_p:.2f} bar",
-            "remedy": "Check for coolant leaks, inspect radiator cap, verify water pump operation",
-            "color": "#fd7e14"
-        })
+        issues.append(_issue("COOLANT_PRESSURE_LOW", f"{cool_p:.2f} bar"))
     elif cool_p > 3.5:
-        issues.append({
-            "severity": "MEDIUM",
-            "icon": "🟡",
-            "issue": "High Coolant Pressure",
-            "value": f"{cool_p:.2f} bar",
-            "remedy": "Inspect cooling system for blockages, check radiator cap rating",
-            "color": "#ffc107"
-        })
+        issues.append(_issue("COOLANT_PRESSURE_HIGH", f"{cool_p:.2f} bar"))
     
     # Fuel Pressure Analysis
     if fuel_p <= 0:
-        issues.append({
-            "severity": "CRITICAL",
-            "icon": "🔴",
-            "issue": "No Fuel Pressure Detected",
-            "value": f"{fuel_p:.2f} bar",
-            "remedy": "Engine cannot run without fuel pressure. Check fuel pump, fuel tank level, and fuel lines",
-            "color": "#dc3545"
-        })
+        issues.append(_issue("FUEL_PRESSURE_NONE", f"{fuel_p:.2f} bar"))
     elif fuel_p < 5:
-        issues.append({
-            "severity": "HIGH",
-            "icon": "🟠",
-            "issue": "Very Low Fuel Pressure",
-            "value": f"{fuel_p:.2f} bar",
-            "remedy": "Check fuel pump, replace fuel filter, inspect fuel lines for blockages",
-            "color": "#fd7e14"
-        })
+        issues.append(_issue("FUEL_PRESSURE_VERY_LOW", f"{fuel_p:.2f} bar"))
     elif fuel_p < 10:
-        issues.append({
-            "severity": "MEDIUM",
-            "icon": "🟡",
-            "issue": "Low Fuel Pressure",
-            "value": f"{fuel_p:.2f} bar",
-            "remedy": "Replace fuel filter, check fuel pump performance, verify fuel quality",
-            "color": "#ffc107"
-        })
+        issues.append(_issue("FUEL_PRESSURE_LOW", f"{fuel_p:.2f} bar"))
     
     # RPM Analysis
     if rpm > 4000:
-        issues.append({
-            "severity": "HIGH",
-            "icon": "🟠",
-            "issue": "Excessive Engine RPM",
-            "value": f"{rpm:.0f} RPM",
-            "remedy": "Reduce engine load immediately, check throttle control, avoid over-revving",
-            "color": "#fd7e14"
-        })
+        issues.append(_issue("RPM_EXCESSIVE", f"{rpm:.0f} RPM"))
     elif rpm > 3500:
-        issues.append({
-            "severity": "MEDIUM",
-            "icon": "🟡",
-            "issue": "High Engine RPM",
-            "value": f"{rpm:.0f} RPM",
-            "remedy": "Reduce load, optimize driving habits, shift to higher gear if applicable",
-            "color": "#ffc107"
-        })
+        issues.append(_issue("RPM_HIGH", f"{rpm:.0f} RPM"))
     elif rpm < 200:
-        issues.append({
-            "severity": "CRITICAL",
-            "icon": "🔴",
-            "issue": "Critically Low RPM / Engine Stall Risk",
-            "value": f"{rpm:.0f} RPM",
-            "remedy": "Engine may not be running or about to stall. Check ignition system, fuel supply, and idle control valve",
-            "color": "#dc3545"
-        })
+        issues.append(_issue("RPM_CRITICAL_LOW", f"{rpm:.0f} RPM"))
     elif rpm < 400:
-        issues.append({
-            "severity": "MEDIUM",
-            "icon": "🟡",
-            "issue": "Very Low RPM",
-            "value": f"{rpm:.0f} RPM",
-            "remedy": "Check idle speed adjustment, inspect throttle body, verify air intake",
-            "color": "#ffc107"
-        })
+        issues.append(_issue("RPM_VERY_LOW", f"{rpm:.0f} RPM"))
     
     # Sort by severity
     severity_order = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}
@@ -262,15 +369,40 @@ def index():
     return render_template('index.html')
 
 
-@app.route('/predict', methods=['POST'])
-def predict():
-    """Handle prediction requests"""
+def _status_and_confidence(prediction, probability, issues):
+    """Combine the model output with rule-based issues into (status, confidence %)"""
+    # Count critical and high severity issues
+    critical_count = sum(1 for i in issues if i['severity'] == 'CRITICAL')
+    high_count = sum(1 for i in issues if i['severity'] == 'HIGH')
+    
+    # Override model prediction when critical/high issues are detected
+    if critical_count > 0:
+        status = "AT RISK"
+        confidence = max(90.0, float(probability[0]) * 100) if prediction == 1 else float(probability[0]) * 100
+    elif high_count > 0:
+        status = "AT RISK"
+        confidence = max(75.0, float(probability[0]) * 100) if prediction == 1 else float(probability[0]) * 100
+    else:
+        status = "HEALTHY" if prediction == 1 else "AT RISK"
+        confidence = float(probability[1]) * 100 if prediction == 1 else float(probability[0]) * 100
+    return status, confidence
+
+
+def compact_issues(issues):
+    """Issue codes and values only; text lives in /issues/dictionary"""
+    return [{'code': i['code'], 'value': i['value']} for i in issues]
+
+
+def predict_engine_health(data, want_explanation=False, compact=False):
+    """Score one reading; returns (response_body, status_code).
+
+    Shared by the Flask route and the ASGI entry point (asgi.py).
+    """
     try:
+        refresh_model_if_updated()
         if model is None:
-            return jsonify({'error': 'Model not loaded on server. Verify model files and deployment path.'}), 503
+            return {'error': 'Model not loaded on server. Verify model files and deployment path.'}, 503
 
-        data = request.json
-        
         # Extract parameters
         rpm = float(data.get('rpm', 0))
         oil_p = float(data.get('oil_pressure', 0))
@@ -279,38 +411,32 @@ def predict():
         oil_t = float(data.get('oil_temp', 0))
         cool_t = float(data.get('coolant_temp', 0))
         
+        compact = compact or parse_flag(data.get('compact'))
+        want_explanation = want_explanation or parse_flag(data.get('explain'))
+        # Keyed by model version, so a hot-swapped model never serves old results
+        cache_key = (f"predict:{model_version or 'bundled'}:{int(compact)}{int(want_explanation)}:"
+                     f"{rpm!r},{oil_p!r},{fuel_p!r},{cool_p!r},{oil_t!r},{cool_t!r}")
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached, 200
+        
         # Prepare input for model (use DataFrame with feature names to avoid warning)
-        feature_names = ['Engine rpm', 'Lub oil pressure', 'Fuel pressure', 'Coolant pressure', 'lub oil temp', 'Coolant temp']
-        input_data = pd.DataFrame([[rpm, oil_p, fuel_p, cool_p, oil_t, cool_t]], columns=feature_names)
+        input_data = pd.DataFrame([[rpm, oil_p, fuel_p, cool_p, oil_t, cool_t]], columns=FEATURE_NAMES)
         
         # Analyze parameters for issues FIRST
         issues = analyze_parameters([rpm, oil_p, fuel_p, cool_p, oil_t, cool_t])
         
-        # Count critical and high severity issues
-        critical_count = sum(1 for i in issues if i['severity'] == 'CRITICAL')
-        high_count = sum(1 for i in issues if i['severity'] == 'HIGH')
-        
-        # Make prediction
-        prediction = model.predict(input_data)[0]
+        # Make prediction (class comes from the probabilities - one forest pass)
         probability = model.predict_proba(input_data)[0]
-        
-        # Override model prediction when critical/high issues are detected
-        if critical_count > 0:
-            status = "AT RISK"
-            confidence = max(90.0, float(probability[0]) * 100) if prediction == 1 else float(probability[0]) * 100
-        elif high_count > 0:
-            status = "AT RISK"
-            confidence = max(75.0, float(probability[0]) * 100) if prediction == 1 else float(probability[0]) * 100
-        else:
-            status = "HEALTHY" if prediction == 1 else "AT RISK"
-            confidence = float(probability[1]) * 100 if prediction == 1 else float(probability[0]) * 100
+        prediction = model.classes_[int(np.argmax(probability))]
+        status, confidence = _status_and_confidence(prediction, probability, issues)
         
         # Prepare response
         response = {
             'status': status,
             'confidence': round(confidence, 1),
             'prediction': int(prediction),
-            'issues': issues,
+            'issues': compact_issues(issues) if compact else issues,
             'parameters': {
                 'rpm': rpm,
                 'oil_pressure': oil_p,
@@ -320,9 +446,126 @@ def predict():
                 'coolant_temp': cool_t
             }
         }
+
+        # Per-reading contributions are opt-in so default latency is unchanged
+        if want_explanation:
+            response['explanation'] = explain(model, model_version, input_data, PARAM_KEYS)[0]
         
-        return jsonify(response)
+        response_cache.set(cache_key, response, PREDICTION_CACHE_TTL)
+        return response, 200
         
+    except Exception as e:
+        return {'error': str(e)}, 400
+
+
+def predict_engine_health_batch(data, compact=True):
+    """Score many readings with one forest pass.
+
+    Returns (response_body, status_code, arrow_table_fn); the table function
+    is None on errors. Batch issues are compact by default.
+    """
+    try:
+        refresh_model_if_updated()
+        if model is None:
+            return {'error': 'Model not loaded on server. Verify model files and deployment path.'}, 503, None
+
+        X = parse_readings(data)
+        if 'compact' in data:
+            compact = parse_flag(data['compact'])
+        probabilities = model.predict_proba(pd.DataFrame(X, columns=FEATURE_NAMES))
+        predictions = model.classes_[np.argmax(probabilities, axis=1)]
+
+        results = []
+        for row, probability, prediction in zip(X.tolist(), probabilities, predictions):
+            issues = analyze_parameters(row)
+            status, confidence = _status_and_confidence(prediction, probability, issues)
+            results.append({
+                'status': status,
+                'confidence': round(confidence, 1),
+                'prediction': int(prediction),
+                'issues': compact_issues(issues) if compact else issues,
+            })
+
+        def arrow_table():
+            import pyarrow as pa
+            columns = {
+                'status': [r['status'] for r in results],
+                'confidence': [r['confidence'] for r in results],
+                'prediction': pa.array([r['prediction'] for r in results], type=pa.int8()),
+                'issue_codes': [[i['code'] for i in r['issues']] for r in results],
+            }
+            for i, key in enumerate(PARAM_KEYS):
+                columns[key] = X[:, i]
+            return pa.table(columns)
+
+        return {'count': len(results), 'model_version': model_version, 'results': results}, 200, arrow_table
+
+    except Exception as e:
+        return {'error': str(e)}, 400, None
+
+
+def respond(body, status=200, table=None):
+    """Encode a body per the request's Accept header (JSON, MessagePack or Arrow)"""
+    payload, media_type = serialization.encode(body, request.headers.get('Accept'), table)
+    return app.response_class(payload, status=status, mimetype=media_type)
+
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    """Handle prediction requests"""
+    # silent=True: a missing or non-JSON body gets the JSON 400 below, not Werkzeug's HTML 415
+    data = request.get_json(silent=True)
+    if data is None:
+        return jsonify({'error': 'Request body must be valid JSON'}), 400
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    body, status = predict_engine_health(data, parse_flag(request.args.get('explain')),
+                                         parse_flag(request.args.get('compact')))
+    return respond(body, status)
+
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Score {"readings": [...]} in one call; supports MessagePack and Arrow responses"""
+    # silent=True: a missing or non-JSON body gets the JSON 400 below, not Werkzeug's HTML 415
+    data = request.get_json(silent=True)
+    if data is None:
+        return jsonify({'error': 'Request body must be valid JSON'}), 400
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    if request.args.get('compact') is not None:
+        data['compact'] = parse_flag(request.args.get('compact'))
+    body, status, table = predict_engine_health_batch(data)
+    return respond(body, status, table)
+
+
+@app.route('/issues/dictionary')
+def issues_dictionary():
+    """Issue code → text/remedy/style table used to expand compact responses"""
+    response = jsonify({
+        'version': ISSUE_DICTIONARY_VERSION,
+        'issues': {code: {**ISSUE_CATALOG[code], **SEVERITY_STYLE[ISSUE_CATALOG[code]['severity']]}
+                   for code in ISSUE_CATALOG}
+    })
+    response.set_etag(ISSUE_DICTIONARY_VERSION)
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response.make_conditional(request)
+
+
+@app.route('/explain', methods=['POST'])
+def explain_readings():
+    """Per-reading feature contributions to the AT RISK probability (batched)"""
+    try:
+        refresh_model_if_updated()
+        if model is None:
+            return jsonify({'error': 'Model not loaded on server. Verify model files and deployment path.'}), 503
+
+        X = pd.DataFrame(parse_readings(request.json or {}), columns=FEATURE_NAMES)
+        return jsonify({
+            'model_version': model_version,
+            'explanations': explain(model, model_version, X, PARAM_KEYS)
+        })
+
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -331,6 +574,7 @@ def predict():
 def get_stats():
     """Get dataset statistics"""
     try:
+        refresh_model_if_updated()
         df = pd.read_csv(os.path.join(BASE_DIR, "engine_data.csv"))
         
         stats = {
@@ -351,31 +595,98 @@ def get_stats():
         return jsonify({'error': str(e)}), 400
 
 
+@app.route('/cache/stats')
+def cache_stats():
+    """Hit/miss counts and size of the response cache"""
+    return jsonify(response_cache.stats())
+
+
+@app.route('/admission/metrics')
+def admission_metrics():
+    """Admitted vs rejected requests per endpoint and current OCR load"""
+    return jsonify(admission_control.snapshot())
+
+
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'OK',
-        'model_loaded': model is not None
+        'model_loaded': model is not None,
+        'model_version': model_version
     })
 
 
+# ================== SIMILAR HISTORICAL READINGS ==================
+
+MAX_SIMILAR_K = 50
+
+similar_index = SimilarityIndex()
+# Build the first tree in the background at startup. asgi.py turns this off
+# for its OCR worker processes, which never serve /similar
+if os.environ.get('SIMILAR_INDEX_AT_STARTUP', '1') == '1':
+    similar_index.rebuild_async()
+
+
+@app.route('/similar', methods=['POST'])
+def similar():
+    """Return the k most similar historical readings and what happened to them"""
+    try:
+        data = request.json or {}
+        X = parse_readings(data)
+        k = max(1, min(int(data.get('k', 5)), MAX_SIMILAR_K))
+
+        dist, labels, sources, rows, features = similar_index.query(X, k=k)
+
+        results = []
+        for q in range(len(X)):
+            neighbors = [{
+                'distance': round(float(dist[q, j]), 4),
+                'source': sources[q, j],
+                'row': int(rows[q, j]),
+                'parameters': dict(zip(PARAM_KEYS, features[q, j].round(4).tolist())),
+                'Engine Condition': int(labels[q, j])
+            } for j in range(dist.shape[1])]
+            at_risk = int((labels[q] == 0).sum())
+            results.append({
+                'neighbors': neighbors,
+                'at_risk_neighbors': at_risk,
+                'at_risk_fraction': round(at_risk / len(neighbors), 3)
+            })
+
+        return jsonify({'k': k, 'results': results, 'index': similar_index.stats()})
+
+    except IndexNotReady as e:
+        response = jsonify({'error': str(e), 'index': similar_index.stats()})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@app.route('/similar/rebuild', methods=['POST'])
+def rebuild_similar_index():
+    """Rebuild the similarity index in the background (serving continues on the old one)"""
+    if not admission.has_api_key(request.headers):
+        return jsonify({'error': 'X-API-Key with a key listed in API_KEYS is required'}), 403
+    started = similar_index.rebuild_async()
+    return jsonify({'started': started, 'index': similar_index.stats()}), 202
+
+
 # ================== LICENSE OCR EXTRACTION ==================
 
 def preprocess_image(image):
-    """Preprocess image for better OCR accuracy"""
-    # Ensure numpy array
+    """Preprocess image for better OCR accuracy (expects BGR or grayscale input)"""
+    # Ensure numpy array (view only - every cv2 step below writes a new array)
     if isinstance(image, Image.Image):
-        image = np.array(image)
-    
-    # Make a copy to avoid modifying original
-    img = image.copy()
+        image = cv2.cvtColor(np.asarray(image.convert('RGB')), cv2.COLOR_RGB2BGR)
     
     # Convert to grayscale if color
-    if len(img.shape) == 3:
-        gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+    if len(image.shape) == 3:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     else:
-        gray = img
+        gray = image
     
     # Resize for better OCR (scale up if too small)
     height, width = gray.shape[:2]
@@ -512,7 +823,7 @@ def extract_expiry_date(text):
     # In this format, first date is issue date, second is validity (expiry)
     
     # Check for Tamil Nadu format: ISSUE DATE ... VALIDITY ... followed by multiple dates
-    tn_format = re.search(r'ISSUE\s*DATE.*?VALIDITY.*?(\d{2}[-/]\d{2}[-/]\d{4}).*?(\d{2}[-/]\d{2}[-/]\d{4})', text_upper)
+    tn_format = re.search(TN_FORMAT_PATTERN, text_upper)
     if tn_format:
         issue_date = tn_format.group(1).replace('/', '-')
         expiry_date = tn_format.group(2).replace('/', '-')
@@ -520,8 +831,7 @@ def extract_expiry_date(text):
         return expiry_date
     
     # Find ALL dates first
-    all_dates_pattern = r'(\d{2}[-/]\d{2}[-/]\d{4})'
-    all_dates = re.findall(all_dates_pattern, text_upper)
+    all_dates = re.findall(DATE_PATTERN, text_upper)
     
     if all_dates:
         parsed_dates = []
@@ -546,153 +856,322 @@ def extract_expiry_date(text):
     return None
 
 
-@app.route('/extract-license', methods=['POST'])
-def extract_license():
-    """Extract license number from uploaded image or PDF"""
+# Images wider than this are downscaled before OCR
+MAX_OCR_WIDTH = 1200
+# PDF pages are rendered at up to this zoom (capped so width <= MAX_OCR_WIDTH)
+PDF_ZOOM = 2.0
+
+# Quality/speed trade-offs selectable per request (?profile= or a "profile" form field).
+# "balanced" is the previous fixed behaviour; "readtext" is passed to EasyOCR.
+OCR_PROFILES = {
+    'fast': {
+        'max_width': 800, 'pdf_zoom': 1.5, 'preprocess': False,
+        'readtext': {'batch_size': 8, 'canvas_size': 1280, 'decoder': 'greedy'},
+    },
+    'balanced': {
+        'max_width': MAX_OCR_WIDTH, 'pdf_zoom': PDF_ZOOM, 'preprocess': False,
+        'readtext': {'batch_size': 4},
+    },
+    'accurate': {
+        'max_width': 1800, 'pdf_zoom': 3.0, 'preprocess': True,
+        'readtext': {'batch_size': 4, 'decoder': 'beamsearch', 'beamWidth': 5, 'mag_ratio': 1.5},
+    },
+}
+# "cascade" runs these in order and stops once license number and expiry are found
+OCR_CASCADE = ('fast', 'accurate')
+DEFAULT_OCR_PROFILE = os.environ.get('OCR_PROFILE', 'balanced')
+
+_REDUCED_DECODE_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
+
+
+def _reduced_decode_flag(data, max_width):
+    """Largest JPEG DCT downscale that still leaves the image at least max_width wide"""
     try:
-        reader = get_ocr_reader()
+        header = Image.open(io.BytesIO(data))  # lazy: parses the header only
+        if header.format != 'JPEG':
+            return cv2.IMREAD_COLOR
+        width, height = header.size
+        # cv2 applies EXIF orientation, so a rotated photo's width is its height
+        if header.getexif().get(0x0112) in (5, 6, 7, 8):
+            width = height
+    except Exception:
+        return cv2.IMREAD_COLOR
 
-        if 'file' not in request.files:
-            return jsonify({'success': False, 'error': 'No file uploaded'}), 400
-        
-        file = request.files['file']
-        
-        if file.filename == '':
-            return jsonify({'success': False, 'error': 'No file selected'}), 400
+    for factor, flag in _REDUCED_DECODE_FLAGS:
+        if width // factor >= max_width:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+def _downscale(img, max_width):
+    """INTER_AREA downscale to max_width; returns img unchanged if already small enough"""
+    height, width = img.shape[:2]
+    if width <= max_width:
+        return img
+    new_size = (max_width, int(height * max_width / width))
+    return cv2.resize(img, new_size, interpolation=cv2.INTER_AREA)
+
+
+def decode_image(data, max_width=MAX_OCR_WIDTH):
+    """Decode uploaded image bytes into a BGR array no wider than max_width.
+
+    Large JPEGs are decoded at 1/2, 1/4 or 1/8 scale by libjpeg, so the
+    full-resolution bitmap is never allocated.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    img = cv2.imdecode(buffer, _reduced_decode_flag(data, max_width))
+    if img is None:
+        # Formats OpenCV can't decode (e.g. some GIF/TIFF variants) go through Pillow
+        with Image.open(io.BytesIO(data)) as image:
+            img = cv2.cvtColor(np.asarray(image.convert('RGB')), cv2.COLOR_RGB2BGR)
+    return _downscale(img, max_width)
+
+
+def render_pdf_page(data, zoom=PDF_ZOOM, max_width=MAX_OCR_WIDTH):
+    """Render the first PDF page straight to a BGR array no wider than max_width.
+
+    The zoom is lowered up front instead of rendering large and resizing,
+    and the pixmap buffer is wrapped without an intermediate bytes copy.
+    """
+    import fitz  # PyMuPDF
+
+    with fitz.open(stream=data, filetype="pdf") as pdf_document:
+        # Only process first page (license is usually on first page)
+        page = pdf_document[0]
+        zoom = min(zoom, max_width / page.rect.width)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+
+    samples = pix.samples_mv if hasattr(pix, 'samples_mv') else pix.samples
+    img = np.frombuffer(samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    # Same channel order as decode_image(); the conversion also copies the pixels
+    # out of the pixmap buffer, which is freed when this function returns
+    return cv2.cvtColor(_downscale(img, max_width), cv2.COLOR_RGB2BGR)
+
+
+def ocr_profile_names():
+    return list(OCR_PROFILES) + ['cascade']
+
+
+def load_ocr_image(filename, data, settings):
+    """Decode/render an upload at the profile's resolution, preprocessed if it asks for it"""
+    if filename.endswith('.pdf'):
+        img = render_pdf_page(data, settings['pdf_zoom'], settings['max_width'])
+    else:
+        img = decode_image(data, settings['max_width'])
+    if settings['preprocess']:
+        img = preprocess_image(img)
+    return img
+
+
+def run_license_ocr(filename, data, profile=None):
+    """OCR an uploaded license image/PDF; returns (response_body, status_code).
+
+    `profile` names an entry of OCR_PROFILES or "cascade", which tries the
+    fast profile first and escalates only when the license number or expiry
+    date is missing. Shared by the Flask route and the ASGI entry point (asgi.py).
+    """
+    profile = profile or DEFAULT_OCR_PROFILE
+    if profile not in OCR_PROFILES and profile != 'cascade':
+        return {
+            'success': False,
+            'error': f"Unknown OCR profile '{profile}'. Use one of: {', '.join(ocr_profile_names())}"
+        }, 400
+
+    # Same bytes + profile give the same result, so any worker can answer from the cache
+    cache_key = f"ocr:{profile}:{'pdf' if filename.endswith('.pdf') else 'img'}:{hashlib.sha256(data).hexdigest()}"
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        print(f"[OCR] Cache hit for {filename} (profile: {profile})")
+        return cached, 200
+
+    try:
+        reader = get_ocr_reader()
         
-        # Get file extension
-        filename = file.filename.lower()
+        import time
+        start_time = time.time()
+        print(f"\n{'='*50}")
+        print(f"[OCR] Processing {'PDF' if filename.endswith('.pdf') else 'image'}: {filename} (profile: {profile})")
         
-        # Save file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
-            file.save(tmp.name)
-            tmp_path = tmp.name
+        passes = OCR_CASCADE if profile == 'cascade' else (profile,)
+        license_number = expiry_date = driver_name = None
+        profiles_run = []
         
-        try:
-            extracted_text = ""
-            
-            if filename.endswith('.pdf'):
-                # Handle PDF files using PyMuPDF
-                try:
-                    import fitz  # PyMuPDF
-                    import time
-                    start_time = time.time()
-                    
-                    print(f"\n{'='*50}")
-                    print(f"[OCR] Processing PDF: {filename}")
-                    
-                    # Open PDF
-                    pdf_document = fitz.open(tmp_path)
-                    
-                    # Only process first page (license is usually on first page)
-                    page = pdf_document[0]
-                    
-                    # Render at 2x zoom (balance between quality and speed)
-                    mat = fitz.Matrix(2.0, 2.0)
-                    pix = page.get_pixmap(matrix=mat)
-                    
-                    # Convert to PIL Image
-                    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                    
-                    # Resize if too large
-                    max_width = 1200
-                    if img.width > max_width:
-                        ratio = max_width / img.width
-                        new_size = (max_width, int(img.height * ratio))
-                        img = img.resize(new_size, Image.LANCZOS)
-                    
-                    img_array = np.array(img)
-                    print(f"[OCR] Image size: {img_array.shape}")
-                    
-                    # Perform OCR once with optimized settings
-                    results = reader.readtext(img_array, paragraph=False, batch_size=4)
-                    extracted_text = ' '.join([result[1] for result in results])
-                    
-                    pdf_document.close()
-                    
-                    ocr_time = time.time() - start_time
-                    print(f"[OCR] Text extraction completed in {ocr_time:.2f}s")
-                    
-                except ImportError as e:
-                    print(f"PyMuPDF import error: {e}")
-                    return jsonify({
-                        'success': False, 
-                        'error': 'PDF processing library not available. Please upload an image instead.'
-                    }), 400
-                except Exception as e:
-                    print(f"PDF processing error: {e}")
-                    return jsonify({
-                        'success': False, 
-                        'error': f'Error processing PDF: {str(e)}'
-                    }), 400
-            else:
-                # Handle image files
-                import time
-                start_time = time.time()
-                
-                image = Image.open(tmp_path)
-                # Convert to RGB if necessary
-                if image.mode != 'RGB':
-                    image = image.convert('RGB')
-                
-                # Resize image for faster processing (max 1200px width)
-                max_width = 1200
-                if image.width > max_width:
-                    ratio = max_width / image.width
-                    new_size = (max_width, int(image.height * ratio))
-                    image = image.resize(new_size, Image.LANCZOS)
-                
-                # Convert to numpy array
-                img_array = np.array(image)
-                
-                print(f"\n{'='*50}")
-                print(f"[OCR] Processing image: {filename}")
-                print(f"[OCR] Image size: {img_array.shape}")
-                
-                # Perform OCR with speed optimizations
-                results = reader.readtext(img_array, paragraph=False, batch_size=4)
-                extracted_text = ' '.join([result[1] for result in results])
-                
-                ocr_time = time.time() - start_time
-                print(f"[OCR] Text extraction completed in {ocr_time:.2f}s")
-            
-            # Extract license number, expiry date, and driver name
-            license_number = extract_license_number(extracted_text)
-            expiry_date = extract_expiry_date(extracted_text)
-            driver_name = extract_driver_name(extracted_text)
+        for name in passes:
+            settings = OCR_PROFILES[name]
+            try:
+                img_array = load_ocr_image(filename, data, settings)
+            except ImportError as e:
+                print(f"PyMuPDF import error: {e}")
+                return {
+                    'success': False, 
+                    'error': 'PDF processing library not available. Please upload an image instead.'
+                }, 400
+            except Exception as e:
+                if not filename.endswith('.pdf'):
+                    raise
+                print(f"PDF processing error: {e}")
+                return {
+                    'success': False, 
+                    'error': f'Error processing PDF: {str(e)}'
+                }, 400
             
-            # Print results cleanly
-            print(f"\n{'='*50}")
-            print(f"[RESULT] Driver Name: {driver_name or 'Not found'}")
-            print(f"[RESULT] License Number: {license_number or 'Not found'}")
-            print(f"[RESULT] Expiry Date: {expiry_date or 'Not found'}")
-            print(f"{'='*50}\n")
+            print(f"[OCR] {name}: image size {img_array.shape}")
             
-            if license_number or driver_name:
-                response = {
-                    'success': True,
-                    'driverName': driver_name,
-                    'licenseNumber': license_number,
-                    'expiryDate': expiry_date,
-                    'rawText': extracted_text[:500] if len(extracted_text) > 500 else extracted_text
-                }
-            else:
-                response = {
-                    'success': False,
-                    'error': 'Could not extract license information. Please ensure the image is clear and try again.',
-                    'rawText': extracted_text[:500] if len(extracted_text) > 500 else extracted_text
-                }
+            results = reader.readtext(img_array, paragraph=False, **settings['readtext'])
+            extracted_text = ' '.join([result[1] for result in results])
+            profiles_run.append(name)
             
-            return jsonify(response)
+            # Fields found by an earlier, faster pass are kept
+            license_number = license_number or extract_license_number(extracted_text)
+            expiry_date = expiry_date or extract_expiry_date(extracted_text)
+            driver_name = driver_name or extract_driver_name(extracted_text)
             
-        finally:
-            # Clean up temp file
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+            if license_number and expiry_date:
+                break
+            if len(profiles_run) < len(passes):
+                print(f"[OCR] {name}: license number or expiry missing, escalating")
+        
+        ocr_time = time.time() - start_time
+        print(f"[OCR] Text extraction completed in {ocr_time:.2f}s ({' -> '.join(profiles_run)})")
+        
+        # Print results cleanly
+        print(f"\n{'='*50}")
+        print(f"[RESULT] Driver Name: {driver_name or 'Not found'}")
+        print(f"[RESULT] License Number: {license_number or 'Not found'}")
+        print(f"[RESULT] Expiry Date: {expiry_date or 'Not found'}")
+        print(f"{'='*50}\n")
+        
+        if license_number or driver_name:
+            response = {
+                'success': True,
+                'driverName': driver_name,
+                'licenseNumber': license_number,
+                'expiryDate': expiry_date,
+                'rawText': extracted_text[:500] if len(extracted_text) > 500 else extracted_text
+            }
+        else:
+            response = {
+                'success': False,
+                'error': 'Could not extract license information. Please ensure the image is clear and try again.',
+                'rawText': extracted_text[:500] if len(extracted_text) > 500 else extracted_text
+            }
+        response['profile'] = profile
+        response['profilesRun'] = profiles_run
+        
+        response_cache.set(cache_key, response, OCR_CACHE_TTL)
+        return response, 200
                 
     except Exception as e:
         print(f"Error in extract_license: {str(e)}")  # Debug log
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return {'success': False, 'error': str(e)}, 500
+
+
+@app.route('/extract-license', methods=['POST'])
+def extract_license():
+    """Extract license number from uploaded image or PDF"""
+    if 'file' not in request.files:
+        return jsonify({'success': False, 'error': 'No file uploaded'}), 400
+    
+    file = request.files['file']
+    
+    if file.filename == '':
+        return jsonify({'success': False, 'error': 'No file selected'}), 400
+    
+    profile = request.args.get('profile') or request.form.get('profile')
+    
+    # Read upload once; decoders work on the bytes directly (no temp file)
+    body, status = run_license_ocr(file.filename.lower(), file.read(), profile)
+    return jsonify(body), status
+
+
+@app.route('/ocr/profiles')
+def ocr_profiles():
+    """Available OCR profiles and the default"""
+    return jsonify({
+        'default': DEFAULT_OCR_PROFILE,
+        'cascade': list(OCR_CASCADE),
+        'profiles': OCR_PROFILES,
+    })
+
+
+# ================== BULK EXPIRY INDEX ==================
+
+MAX_EXPIRY_PAGE = 1000
+
+expiry_index = ExpiryIndex()
+
+
+def _expiry_page(result, offset):
+    """Serialize an ExpiryIndex.range() result"""
+    return {
+        'total': result['total'],
+        'offset': offset,
+        'nextOffset': result['next_offset'],
+        'records': [{'id': doc_id, 'expiryDate': str(day)}
+                    for doc_id, day in zip(result['ids'].tolist(), result['expiry'])]
+    }
+
+
+def _paging_args():
+    offset = max(0, int(request.args.get('offset', 0)))
+    limit = max(1, min(int(request.args.get('limit', 500)), MAX_EXPIRY_PAGE))
+    return offset, limit
+
+
+@app.route('/expiry/bulk', methods=['POST'])
+def expiry_bulk():
+    """Parse expiry dates for many documents and add them to the expiry index"""
+    try:
+        data = request.json or {}
+        records = data.get('records')
+        if not isinstance(records, list) or not records:
+            return jsonify({'error': "'records' must be a non-empty list"}), 400
+
+        frame = pd.DataFrame.from_records(records, columns=['id', 'expiryDate', 'text'])
+        if frame['id'].isna().any():
+            return jsonify({'error': "Every record needs an 'id'"}), 400
+        frame['id'] = frame['id'].astype(str)
+
+        parsed = parse_expiry_dates(frame['expiryDate'], frame['text'])
+        indexed = expiry_index.upsert(frame['id'], parsed, replace=parse_flag(data.get('replace')),
+                                      remove_unparsed=parse_flag(data.get('removeUnparsed')))
+
+        ok = parsed.notna()
+        return jsonify({
+            'parsed': int(ok.sum()),
+            'unparsed': frame.loc[~ok, 'id'].tolist(),
+            'indexed': indexed,
+            'records': [{'id': doc_id, 'expiryDate': day}
+                        for doc_id, day in zip(frame.loc[ok, 'id'], parsed[ok].dt.strftime('%Y-%m-%d'))]
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@app.route('/expiry/expiring')
+def expiry_expiring():
+    """Documents expiring within ?days=N (default 30), soonest first, in pages"""
+    try:
+        days = int(request.args.get('days', 30))
+        offset, limit = _paging_args()
+        return jsonify(_expiry_page(expiry_index.expiring_within(days, offset=offset, limit=limit), offset))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@app.route('/expiry/expired')
+def expiry_expired():
+    """Documents already past their expiry date, oldest first, in pages"""
+    try:
+        offset, limit = _paging_args()
+        return jsonify(_expiry_page(expiry_index.expired(offset=offset, limit=limit), offset))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
 
 
 if __name__ == '__main__':
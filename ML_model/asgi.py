@@ -0,0 +1,220 @@
+"""
+ASGI entry point for the ML service.
+
+/predict, /predict/batch and /extract-license are served natively: request
+bodies are read asynchronously and the CPU-bound model / OCR work runs in
+two separate executors, so a backlog of slow OCR uploads can never occupy the threads
+that /predict needs. Every other route is the unchanged Flask app mounted
+as WSGI.
+
+Run:
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT
+
+Environment:
+    PREDICT_WORKERS  threads for /predict (default 4)
+    OCR_WORKERS      concurrent OCR jobs (default 2)
+    OCR_EXECUTOR     "thread" (default) or "process" to isolate OCR from the
+                     GIL entirely; each process loads its own EasyOCR model
+
+Use OCR_EXECUTOR=process when OCR traffic is heavy. In thread mode the
+pure-Python parts of every OCR job still take the GIL from /predict, so its
+tail latency rises with OCR load; worker processes avoid that at the cost
+of one EasyOCR model in memory per OCR worker.
+"""
+
+import asyncio
+import contextlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.formparsers import MultiPartParser
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+
+import admission
+import app as service
+import serialization
+
+PREDICT_WORKERS = int(os.environ.get('PREDICT_WORKERS', 4))
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', 2))
+OCR_EXECUTOR = os.environ.get('OCR_EXECUTOR', 'thread')
+
+predict_executor = ThreadPoolExecutor(PREDICT_WORKERS, thread_name_prefix='predict')
+if OCR_EXECUTOR == 'process':
+    # Inherited by the spawned OCR workers, which import app but never serve /similar
+    os.environ['SIMILAR_INDEX_AT_STARTUP'] = '0'
+    ocr_executor = ProcessPoolExecutor(OCR_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+else:
+    ocr_executor = ThreadPoolExecutor(OCR_WORKERS, thread_name_prefix='ocr')
+
+
+def _encoded(request, body, status, table=None):
+    """Response encoded per the Accept header (JSON, MessagePack or Arrow)"""
+    payload, media_type = serialization.encode(body, request.headers.get('accept'), table)
+    return Response(payload, status_code=status, media_type=media_type)
+
+
+class BodyTooLarge(Exception):
+    """Request body passed the endpoint's size limit while it was being read"""
+
+
+async def _limited_stream(request, endpoint):
+    """request.stream(), stopped with BodyTooLarge past the endpoint's max_bytes.
+
+    Content-Length is checked up front by admission control; this also
+    catches chunked uploads, which carry no length.
+    """
+    max_bytes = admission.POLICIES[endpoint].max_bytes
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            service.admission_control.record(endpoint, 'too_large')
+            raise BodyTooLarge(f"Request body exceeds {max_bytes // 1024} KB limit")
+        yield chunk
+
+
+def _too_large(error):
+    return JSONResponse({'success': False, 'error': str(error)}, status_code=413)
+
+
+async def _json_body(request, endpoint):
+    """Parsed JSON object from the request (ValueError if invalid or not an object)"""
+    body = b''.join([chunk async for chunk in _limited_stream(request, endpoint)])
+    data = serialization.loads_json(body) if body else {}
+    if not isinstance(data, dict):
+        raise ValueError('Request body must be a JSON object')
+    return data
+
+
+def _admit(request, endpoint):
+    """Run the shared admission controller for a natively served route"""
+    client = admission.client_identity(request.headers, request.client.host if request.client else None)
+    length = request.headers.get('content-length')
+    return service.admission_control.admit(endpoint, client, int(length) if length and length.isdigit() else None)
+
+
+async def _rejected(request, endpoint, decision):
+    """Error response for a turned-away request.
+
+    429/503 bodies are read (up to the endpoint's limit) and discarded first:
+    clients that send the whole upload before reading, like urllib or axios
+    with form-data, otherwise see a connection reset instead of the answer.
+    """
+    if decision.status != 413:
+        max_bytes, received = admission.POLICIES[endpoint].max_bytes, 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes:
+                break
+    headers = {'Retry-After': str(decision.retry_after)} if decision.retry_after else None
+    return JSONResponse({'success': False, 'error': decision.error}, status_code=decision.status, headers=headers)
+
+
+async def predict(request):
+    """Async /predict: parse JSON on the event loop, score in the predict pool"""
+    decision = _admit(request, 'predict')
+    if not decision.admitted:
+        return await _rejected(request, 'predict', decision)
+
+    try:
+        data = await _json_body(request, 'predict')
+    except BodyTooLarge as error:
+        return _too_large(error)
+    except ValueError as error:
+        return JSONResponse({'error': f'Invalid JSON body: {error}'}, status_code=400)
+
+    loop = asyncio.get_running_loop()
+    body, status = await loop.run_in_executor(
+        predict_executor, service.predict_engine_health, data,
+        service.parse_flag(request.query_params.get('explain')),
+        service.parse_flag(request.query_params.get('compact'))
+    )
+    return _encoded(request, body, status)
+
+
+async def predict_batch(request):
+    """Async /predict/batch: one forest pass for all readings in the predict pool"""
+    decision = _admit(request, 'predict_batch')
+    if not decision.admitted:
+        return await _rejected(request, 'predict_batch', decision)
+
+    try:
+        data = await _json_body(request, 'predict_batch')
+    except BodyTooLarge as error:
+        return _too_large(error)
+    except ValueError as error:
+        return JSONResponse({'error': f'Invalid JSON body: {error}'}, status_code=400)
+
+    if request.query_params.get('compact') is not None:
+        data['compact'] = service.parse_flag(request.query_params.get('compact'))
+
+    loop = asyncio.get_running_loop()
+    body, status, table = await loop.run_in_executor(
+        predict_executor, service.predict_engine_health_batch, data
+    )
+    return _encoded(request, body, status, table)
+
+
+async def extract_license(request):
+    """Async /extract-license: stream the upload in, OCR in the OCR pool"""
+    decision = _admit(request, 'extract_license')
+    if not decision.admitted:
+        return await _rejected(request, 'extract_license', decision)
+
+    release = decision.release or (lambda: None)
+    try:
+        if not request.headers.get('content-type', '').startswith('multipart/form-data'):
+            release()
+            return JSONResponse({'success': False, 'error': 'No file uploaded'}, status_code=400)
+
+        form = await MultiPartParser(request.headers, _limited_stream(request, 'extract_license')).parse()
+        file = form.get('file')
+
+        if file is None or isinstance(file, str):
+            release()
+            return JSONResponse({'success': False, 'error': 'No file uploaded'}, status_code=400)
+
+        if not file.filename:
+            release()
+            return JSONResponse({'success': False, 'error': 'No file selected'}, status_code=400)
+
+        profile = request.query_params.get('profile') or form.get('profile')
+        data = await file.read()
+        await form.close()
+    except BodyTooLarge as error:
+        release()
+        return _too_large(error)
+    except Exception:
+        release()
+        raise
+
+    loop = asyncio.get_running_loop()
+    job = loop.run_in_executor(ocr_executor, service.run_license_ocr, file.filename.lower(), data, profile)
+    # The OCR slot is held until the job itself finishes, even if the client disconnects
+    job.add_done_callback(lambda _: release())
+    body, status = await job
+    return JSONResponse(body, status_code=status)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    predict_executor.shutdown(wait=False)
+    ocr_executor.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=[
+        Route('/predict', predict, methods=['POST']),
+        Route('/predict/batch', predict_batch, methods=['POST']),
+        Route('/extract-license', extract_license, methods=['POST']),
+        Mount('/', app=WSGIMiddleware(service.app)),
+    ],
+    lifespan=lifespan,
+)
+app.add_middleware(CORSMiddleware, allow_origins=service.CORS_ORIGINS, allow_methods=['*'], allow_headers=['*'])
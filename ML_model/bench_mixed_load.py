@@ -0,0 +1,149 @@
+"""
+Mixed-load benchmark: /predict latency while /extract-license is saturated.
+
+Runs two phases against a running server and prints /predict latency
+percentiles for each:
+  1. idle     - /predict probes only
+  2. loaded   - the same probes while N clients upload OCR files back-to-back
+
+Start the server with CACHE_BACKEND=none. Otherwise every repeated upload
+is answered from the response cache and OCR is never saturated. The
+benchmark checks /cache/stats and refuses to run against a cached server.
+Rate limits must be off (RATE_LIMITS unset, the default), or the OCR clients
+are throttled to a few uploads a minute. Uploads the server turns away
+(429/503) are counted and reported separately.
+Each /predict probe also sends slightly different readings, so a cache
+cannot flatter the latency numbers.
+
+Usage:
+    python bench_mixed_load.py --url http://localhost:5000 --file license.jpg
+    python bench_mixed_load.py --url http://localhost:8000 --file license.pdf --ocr-clients 8 --duration 30
+"""
+
+import argparse
+import json
+import mimetypes
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+import numpy as np
+
+rng = np.random.default_rng()
+
+
+def predict_body():
+    """A typical reading with small random jitter, so no two probes are identical"""
+    return json.dumps({
+        'rpm': 850 + float(rng.uniform(-50, 50)), 'oil_pressure': 3.2 + float(rng.uniform(-0.2, 0.2)),
+        'fuel_pressure': 7.5, 'coolant_pressure': 2.4, 'oil_temp': 78.0, 'coolant_temp': 80.0
+    }).encode()
+
+
+def get_json(url):
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def post_predict(url):
+    request = urllib.request.Request(f"{url}/predict", data=predict_body(),
+                                     headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=120) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def multipart_body(path):
+    boundary = uuid.uuid4().hex
+    with open(path, 'rb') as fh:
+        content = fh.read()
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{os.path.basename(path)}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def ocr_client(url, body, content_type, stop, completed, rejected):
+    while not stop.is_set():
+        request = urllib.request.Request(f"{url}/extract-license", data=body,
+                                         headers={'Content-Type': content_type})
+        try:
+            with urllib.request.urlopen(request, timeout=300) as response:
+                response.read()
+            completed.append(time.perf_counter())
+        except urllib.error.HTTPError as error:
+            if error.code not in (429, 503):
+                raise
+            rejected.append(error.code)
+            time.sleep(float(error.headers.get('Retry-After') or 0.5))
+        except Exception as error:
+            print(f"  OCR request failed: {error}")
+            time.sleep(0.5)
+
+
+def probe_predict(url, duration, interval):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        latencies.append(post_predict(url))
+        time.sleep(interval)
+    return np.array(latencies) * 1000
+
+
+def summarize(name, latencies):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{name:8s} n={len(latencies):5d}  p50={p50:8.1f}ms  p95={p95:8.1f}ms  "
+          f"p99={p99:8.1f}ms  max={latencies.max():8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /predict latency under OCR load")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--file", required=True, help="license image or PDF to upload")
+    parser.add_argument("--ocr-clients", type=int, default=4, help="concurrent OCR uploaders")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per phase")
+    parser.add_argument("--interval", type=float, default=0.05, help="pause between /predict probes")
+    args = parser.parse_args()
+
+    url = args.url.rstrip('/')
+    backend = get_json(f"{url}/cache/stats").get('backend')
+    if backend != 'none':
+        raise SystemExit(f"Server response cache is '{backend}'; restart it with CACHE_BACKEND=none "
+                         f"so repeated uploads are really OCRed")
+    if get_json(f"{url}/admission/metrics").get('rate_limits'):
+        raise SystemExit("Server has RATE_LIMITS=1; restart it without rate limits so the OCR "
+                         "clients are not throttled to a few uploads a minute")
+    post_predict(url)  # warm up
+
+    print(f"Benchmarking {url}")
+    idle = probe_predict(url, args.duration, args.interval)
+
+    body, content_type = multipart_body(args.file)
+    stop = threading.Event()
+    completed, rejected = [], []
+    clients = [threading.Thread(target=ocr_client, args=(url, body, content_type, stop, completed, rejected),
+                                daemon=True)
+               for _ in range(args.ocr_clients)]
+    for client in clients:
+        client.start()
+    time.sleep(min(2.0, args.duration / 4))  # let the OCR queue fill up
+    started = len(completed)
+    loaded = probe_predict(url, args.duration, args.interval)
+    ocr_done = len(completed) - started
+    stop.set()
+
+    summarize("idle", idle)
+    summarize("loaded", loaded)
+    print(f"OCR throughput while loaded: {ocr_done / args.duration:.2f} req/s "
+          f"({args.ocr_clients} clients, {len(rejected)} uploads rejected with 429/503)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+OCR profile benchmark: speed vs fields found for each profile.
+
+Runs every profile (and the cascade) over a set of license images/PDFs
+in-process and prints, per profile:
+  - prepare time  (decode / PDF render / preprocess; first pass for the cascade)
+  - total time    (prepare + EasyOCR readtext + field extraction, all passes)
+  - how many files yielded a license number and an expiry date
+  - for the cascade, how often it escalated past the fast profile
+
+The response cache is switched off for the run, so every repeat really
+runs OCR instead of returning the first result from the cache.
+
+Usage:
+    python bench_ocr_profiles.py samples/*.jpg samples/*.pdf
+    python bench_ocr_profiles.py --repeat 3 --prepare-only license.jpg
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import numpy as np
+
+import app as service
+import cache
+
+
+def time_prepare(filename, data, settings, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        img = service.load_ocr_image(filename, data, settings)
+        timings.append(time.perf_counter() - start)
+    return img, float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare OCR profiles on sample licenses")
+    parser.add_argument("files", nargs='+', help="license images or PDFs")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per file (median is reported)")
+    parser.add_argument("--prepare-only", action='store_true',
+                        help="time decode/preprocess only (no EasyOCR needed)")
+    args = parser.parse_args()
+
+    # Repeats of the same file would otherwise be cache hits
+    service.response_cache = cache.NullCache()
+
+    samples = []
+    for path in args.files:
+        with open(path, 'rb') as fh:
+            samples.append((os.path.basename(path).lower(), fh.read()))
+
+    if not args.prepare_only:
+        service.get_ocr_reader()
+        if service.ocr_reader is None:
+            raise SystemExit(f"EasyOCR unavailable: {service.ocr_init_error}")
+
+    print(f"{'profile':10s} {'prepare':>10s} {'total':>10s} {'pixels':>10s} {'license':>8s} {'expiry':>8s} {'escalated':>10s}")
+    for profile in service.ocr_profile_names():
+        prepare, pixels, total, licenses, expiries, escalated = [], [], [], 0, 0, 0
+        for filename, data in samples:
+            # The cascade always starts with its first (fast) profile
+            first = service.OCR_CASCADE[0] if profile == 'cascade' else profile
+            img, seconds = time_prepare(filename, data, service.OCR_PROFILES[first], args.repeat)
+            prepare.append(seconds)
+            pixels.append(img.shape[0] * img.shape[1])
+
+            if args.prepare_only:
+                continue
+
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    body, _ = service.run_license_ocr(filename, data, profile)
+                timings.append(time.perf_counter() - start)
+            total.append(float(np.median(timings)))
+            licenses += bool(body.get('licenseNumber'))
+            expiries += bool(body.get('expiryDate'))
+            escalated += len(body.get('profilesRun', [])) > 1
+
+        total_ms = f"{np.mean(total) * 1000:8.0f}ms" if total else f"{'-':>10s}"
+        found = (f"{licenses:>4d}/{len(samples):<3d} {expiries:>4d}/{len(samples):<3d}" if total
+                 else f"{'-':>8s} {'-':>8s}")
+        print(f"{profile:10s} {np.mean(prepare) * 1000:8.1f}ms {total_ms} {np.mean(pixels) / 1e6:8.2f}MP "
+              f"{found} {escalated if profile == 'cascade' and total else '-':>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+"""
+Response Cache
+Pluggable caches for OCR results and predictions, all with per-entry TTL
+and least-recently-used eviction past max_entries:
+
+    memory   in-process LRU (default; each worker keeps its own)
+    sqlite   one WAL-mode file shared by every worker on the host
+    redis    any Redis-protocol server, shared across hosts (needs redis-py)
+    none     caching disabled
+
+Values are stored JSON-encoded, so every backend hands back a fresh copy.
+A failing shared backend never fails a request: errors count as misses.
+
+Environment:
+    CACHE_BACKEND       memory | sqlite | redis | none (default memory)
+    CACHE_MAX_ENTRIES   entries kept before LRU eviction (default 10000)
+    CACHE_PATH          SQLite file (default response_cache.sqlite3 next to this module)
+    CACHE_URL           Redis URL (default redis://localhost:6379/0)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from serialization import dumps_json, loads_json
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+CACHE_PATH = os.environ.get('CACHE_PATH', os.path.join(BASE_DIR, 'response_cache.sqlite3'))
+CACHE_URL = os.environ.get('CACHE_URL', 'redis://localhost:6379/0')
+DEFAULT_TTL = 3600
+
+
+class Cache:
+    """get/set/delete/clear over JSON values; subclasses store raw bytes"""
+
+    backend = 'base'
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, default_ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'errors': 0}
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _error(self, action, error):
+        self._count('errors')
+        if self._stats['errors'] == 1:
+            print(f"[CACHE] {self.backend} {action} failed, treating as a miss: {error}")
+
+    def get(self, key):
+        """Cached value or None when missing, expired or the backend is unavailable"""
+        try:
+            raw = self._get(key)
+        except Exception as error:
+            self._error('get', error)
+            raw = None
+        self._count('hits' if raw is not None else 'misses')
+        return loads_json(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        """Store a JSON-serializable value for ttl seconds (default_ttl when None)"""
+        try:
+            self._set(key, dumps_json(value), ttl or self.default_ttl)
+            self._count('sets')
+        except Exception as error:
+            self._error('set', error)
+
+    def delete(self, key):
+        try:
+            self._delete(key)
+        except Exception as error:
+            self._error('delete', error)
+
+    def clear(self):
+        self._clear()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        try:
+            entries = len(self)
+        except Exception:
+            entries = None
+        stats.update({
+            'backend': self.backend,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'hit_rate': round(stats['hits'] / lookups, 3) if lookups else None,
+        })
+        return stats
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, raw, ttl):
+        raise NotImplementedError
+
+    def _delete(self, key):
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class NullCache(Cache):
+    """Caching disabled: every lookup misses"""
+
+    backend = 'none'
+
+    def _get(self, key):
+        return None
+
+    def _set(self, key, raw, ttl):
+        pass
+
+    def _delete(self, key):
+        pass
+
+    def _clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class MemoryCache(Cache):
+    """In-process LRU: an OrderedDict of key -> (expires_at, raw)"""
+
+    backend = 'memory'
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, default_ttl=DEFAULT_TTL):
+        super().__init__(max_entries, default_ttl)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _set(self, key, raw, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, raw)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache(Cache):
+    """File-backed cache shared by all worker processes on one host.
+
+    Each thread (and each forked worker) opens its own connection. A hit
+    only writes when the entry's last-access time is more than TOUCH_AFTER_S
+    old, so hits on hot entries stay read-only and do not queue for the WAL
+    writer lock. Every EVICT_EVERY writes, expired rows are deleted and the
+    least recently used rows beyond max_entries are dropped.
+    """
+
+    backend = 'sqlite'
+    EVICT_EVERY = 64
+    # LRU order is only this precise; eviction is rare, hits are not
+    TOUCH_AFTER_S = 60
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES, default_ttl=DEFAULT_TTL):
+        super().__init__(max_entries, default_ttl)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._connect()
+        conn.execute('''CREATE TABLE IF NOT EXISTS cache (
+                            key TEXT PRIMARY KEY, value BLOB NOT NULL,
+                            expires REAL NOT NULL, accessed REAL NOT NULL)''')
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+
+    def _connect(self):
+        # Connections must not cross a fork, so they are keyed by pid as well as thread
+        pid, conn = getattr(self._local, 'conn', (None, None))
+        if conn is None or pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = (os.getpid(), conn)
+        return conn
+
+    def _get(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute('SELECT value, expires, accessed FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            conn.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, now))
+            return None
+        if now - row[2] > self.TOUCH_AFTER_S:
+            conn.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return bytes(row[0])
+
+    def _set(self, key, raw, ttl):
+        conn = self._connect()
+        now = time.time()
+        conn.execute('INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                     (key, raw, now + ttl, now))
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self.evict(now)
+
+    def evict(self, now=None):
+        """Drop expired rows, then the least recently used rows past max_entries"""
+        conn = self._connect()
+        conn.execute('DELETE FROM cache WHERE expires <= ?', (now or time.time(),))
+        conn.execute('''DELETE FROM cache WHERE key IN (
+                            SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)''',
+                     (self.max_entries,))
+
+    def _delete(self, key):
+        self._connect().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def _clear(self):
+        self._connect().execute('DELETE FROM cache')
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+
+class RedisCache(Cache):
+    """Redis-protocol cache shared across hosts.
+
+    Entries expire server-side (SET ... PX). A sorted set of key -> last
+    access time bounds the entry count: once it grows past max_entries the
+    oldest keys are popped and deleted. Pass `client` to use an existing
+    connection (e.g. a local stand-in server in tests).
+    """
+
+    backend = 'redis'
+
+    def __init__(self, url=CACHE_URL, max_entries=CACHE_MAX_ENTRIES, default_ttl=DEFAULT_TTL,
+                 client=None, prefix='rmc:cache:'):
+        super().__init__(max_entries, default_ttl)
+        if client is None:
+            if redis is None:
+                raise RuntimeError("CACHE_BACKEND=redis needs the 'redis' package (pip install redis)")
+            client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._client = client
+        self.prefix = prefix
+        self._index = f"{prefix}__lru__"
+
+    def _get(self, key):
+        full_key = self.prefix + key
+        raw = self._client.get(full_key)
+        if raw is not None:
+            self._client.zadd(self._index, {full_key: time.time()}, xx=True)
+        return raw
+
+    def _set(self, key, raw, ttl):
+        full_key = self.prefix + key
+        pipe = self._client.pipeline(transaction=False)
+        pipe.set(full_key, raw, px=int(ttl * 1000))
+        pipe.zadd(self._index, {full_key: time.time()})
+        pipe.zcard(self._index)
+        size = pipe.execute()[-1]
+        if size > self.max_entries:
+            oldest = [member for member, _ in self._client.zpopmin(self._index, size - self.max_entries)]
+            if oldest:
+                self._client.delete(*oldest)
+
+    def _delete(self, key):
+        full_key = self.prefix + key
+        pipe = self._client.pipeline(transaction=False)
+        pipe.delete(full_key)
+        pipe.zrem(self._index, full_key)
+        pipe.execute()
+
+    def _clear(self):
+        keys = self._client.zrange(self._index, 0, -1)
+        if keys:
+            self._client.delete(*keys)
+        self._client.delete(self._index)
+
+    def __len__(self):
+        # Counts tracked keys; ones that expired server-side drop out when popped
+        return self._client.zcard(self._index)
+
+
+BACKENDS = {
+    'none': NullCache,
+    'memory': MemoryCache,
+    'sqlite': SQLiteCache,
+    'redis': RedisCache,
+}
+
+
+def create_cache(backend=None, **kwargs):
+    """Build the cache named by CACHE_BACKEND (or `backend`)"""
+    backend = (backend or CACHE_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown cache backend '{backend}'. Use one of: {', '.join(BACKENDS)}")
+    return BACKENDS[backend](**kwargs)
@@ -0,0 +1,247 @@
+"""
+License Expiry Index
+Bulk, vectorized expiry-date parsing plus a sorted (expiry, id) index, so
+"what expires in the next N days" is two binary searches instead of a scan
+over every document.
+
+The index is persisted to expiry_index.npz after each update and reloaded
+when the file changes, so every worker process serves the same data.
+Updates hold an flock on a sidecar .lock file across reload, merge and save,
+so concurrent writers in different workers cannot drop each other's records.
+"""
+
+import contextlib
+import os
+import tempfile
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: updates are serialized within one process only
+    fcntl = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_FILE = os.path.join(BASE_DIR, "expiry_index.npz")
+
+# Same rules as extract_expiry_date(): Tamil Nadu "ISSUE DATE ... VALIDITY"
+# layout takes the second date, otherwise the furthest date wins
+DATE_PATTERN = r'(\d{2}[-/]\d{2}[-/]\d{4})'
+TN_FORMAT_PATTERN = r'ISSUE\s*DATE.*?VALIDITY.*?(\d{2}[-/]\d{2}[-/]\d{4}).*?(\d{2}[-/]\d{2}[-/]\d{4})'
+
+# ISO values must carry a full calendar date; a bare "2045" or "2045-10" is
+# not an expiry date
+ISO_DATE_PATTERN = r'^\d{4}-\d{2}-\d{2}(?:$|[T ])'
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+def _parse_day_first(values):
+    """DD-MM-YYYY / DD/MM/YYYY strings → datetime64 Series (NaT when invalid).
+
+    The fixed-width layout is decoded straight from the unicode code points
+    with numpy, which is several times faster than pd.to_datetime(format=...).
+    """
+    values = values.astype('string')
+    lengths = values.str.len().fillna(0).to_numpy()
+    codes = np.asarray(values.fillna('').to_numpy(dtype=object), dtype='U10').view(np.uint32).reshape(-1, 10)
+    digits = codes.astype(np.int64) - ord('0')
+
+    seps = codes[:, [2, 5]]
+    ok = (lengths == 10) \
+        & ((digits[:, [0, 1, 3, 4, 6, 7, 8, 9]] >= 0) & (digits[:, [0, 1, 3, 4, 6, 7, 8, 9]] <= 9)).all(axis=1) \
+        & ((seps == ord('-')) | (seps == ord('/'))).all(axis=1)
+
+    day = digits[:, 0] * 10 + digits[:, 1]
+    month = digits[:, 3] * 10 + digits[:, 4]
+    year = digits[:, 6] * 1000 + digits[:, 7] * 100 + digits[:, 8] * 10 + digits[:, 9]
+    ok &= (day >= 1) & (month >= 1) & (month <= 12) & (year >= 1900) & (year <= 2200)
+
+    months = np.where(ok, (year - 1970) * 12 + month - 1, 0).astype('datetime64[M]')
+    parsed = months.astype('datetime64[D]') + np.where(ok, day - 1, 0).astype('timedelta64[D]')
+    # Reject day overflow such as 31-02-2030
+    ok &= parsed.astype('datetime64[M]') == months
+
+    result = np.where(ok, parsed, np.datetime64('NaT')).astype('datetime64[ns]')
+    return pd.Series(result, index=values.index)
+
+
+def _to_naive_utc(values):
+    return pd.to_datetime(values, format='ISO8601', utc=True, errors='coerce').tz_convert(None)
+
+
+def _parse_iso(values):
+    """ISO-8601 strings → naive datetime64 Series in UTC (NaT when invalid).
+
+    Only values starting with YYYY-MM-DD are accepted. Offsets such as the
+    "...T00:00:00.000Z" that JSON-serialized Mongo dates carry are converted
+    to UTC before the timezone is dropped.
+    """
+    values = values.where(values.str.match(ISO_DATE_PATTERN).fillna(False).astype(bool))
+    try:
+        return pd.Series(_to_naive_utc(values.to_numpy(dtype=object)), index=values.index)
+    except (ValueError, TypeError, OverflowError):
+        # One odd value must not fail the whole batch, so retry record by record
+        parsed = []
+        for value in values:
+            try:
+                parsed.append(_to_naive_utc([value])[0])
+            except (ValueError, TypeError, OverflowError):
+                parsed.append(pd.NaT)
+        return pd.Series(parsed, index=values.index, dtype='datetime64[ns]')
+
+
+def parse_expiry_dates(expiry=None, text=None):
+    """Vectorized expiry parsing for many records at once.
+
+    `expiry` holds already-extracted dates (DD-MM-YYYY, DD/MM/YYYY or ISO),
+    `text` holds raw OCR text used where `expiry` is missing. Both are
+    sequences of equal length (entries may be None). Returns a
+    datetime64[ns] Series with NaT where nothing could be parsed.
+    """
+    expiry = pd.Series(expiry, dtype='object') if expiry is not None else pd.Series([None] * len(text), dtype='object')
+    text = pd.Series(text, dtype='object') if text is not None else pd.Series([None] * len(expiry), dtype='object')
+    expiry = expiry.astype('string').str.strip()
+
+    parsed = _parse_day_first(expiry)
+    missing = parsed.isna() & expiry.notna()
+    if missing.any():
+        parsed[missing] = _parse_iso(expiry[missing])
+
+    needs_text = parsed.isna() & text.notna()
+    if needs_text.any():
+        upper = text[needs_text].astype('string').str.upper()
+
+        tn = upper.str.extract(TN_FORMAT_PATTERN)[1]
+        from_tn = _parse_day_first(tn)
+
+        found = upper.str.findall(DATE_PATTERN).explode().dropna()
+        furthest = _parse_day_first(found.astype('string')).groupby(level=0).max()
+
+        parsed[needs_text] = from_tn.fillna(furthest.reindex(from_tn.index))
+
+    return parsed
+
+
+class ExpiryIndex:
+    """Sorted expiry index with range queries and file-backed sharing"""
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self._lock = threading.Lock()
+        self._days = np.empty(0, dtype=np.int64)   # days since epoch, ascending
+        self._ids = np.empty(0, dtype=str)
+        self._mtime = None
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """Thread lock plus an inter-process flock for read-merge-save cycles"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _file_signature(self):
+        # os.replace gives every save a new inode, so this changes even when
+        # two saves land within the filesystem's mtime resolution
+        stat = os.stat(self.path)
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _reload_if_changed(self):
+        try:
+            mtime = self._file_signature()
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+        with np.load(self.path) as data:
+            self._days, self._ids = data['days'], data['ids']
+        self._mtime = mtime
+
+    def _save(self):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.npz')
+        os.close(fd)
+        try:
+            np.savez(tmp_path, days=self._days, ids=self._ids)
+            os.replace(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        self._mtime = self._file_signature()
+
+    def upsert(self, ids, expiry_dates, replace=False, remove_unparsed=False):
+        """Insert or update many (id, expiry) pairs.
+
+        NaT entries leave the id's existing expiry untouched, so a bad scan
+        cannot drop a document from the alert queries; pass remove_unparsed
+        to delete those ids instead. replace rebuilds the index from the
+        valid pairs of this batch.
+        """
+        ids = np.asarray(ids, dtype=str)
+        dates = pd.DatetimeIndex(expiry_dates)
+        valid = ~dates.isna()
+        days = dates[valid].values.astype('datetime64[D]').astype(np.int64)
+
+        with self._exclusive():
+            self._reload_if_changed()
+            if replace:
+                keep = np.zeros(len(self._ids), dtype=bool)
+            else:
+                keep = ~np.isin(self._ids, ids if remove_unparsed else ids[valid])
+
+            # Later duplicates in the batch win
+            new_ids, new_days = ids[valid][::-1], days[::-1]
+            new_ids, first = np.unique(new_ids, return_index=True)
+            new_days = new_days[first]
+
+            all_days = np.concatenate([self._days[keep], new_days])
+            all_ids = np.concatenate([self._ids[keep], new_ids])
+            order = np.argsort(all_days, kind='stable')
+            self._days, self._ids = all_days[order], all_ids[order]
+            self._save()
+            return len(self._ids)
+
+    def range(self, start=None, end=None, offset=0, limit=500):
+        """Records with start <= expiry <= end (dates), sorted by expiry, paginated"""
+        with self._lock:
+            self._reload_if_changed()
+            days, ids = self._days, self._ids
+
+        lo = 0 if start is None else int(np.searchsorted(days, (np.datetime64(start, 'D') - EPOCH).astype(np.int64), 'left'))
+        hi = len(days) if end is None else int(np.searchsorted(days, (np.datetime64(end, 'D') - EPOCH).astype(np.int64), 'right'))
+
+        total = max(0, hi - lo)
+        page_lo = lo + offset
+        page_hi = min(hi, page_lo + limit)
+        page_days = days[page_lo:page_hi]
+        return {
+            'total': total,
+            'ids': ids[page_lo:page_hi],
+            'expiry': (EPOCH + page_days.astype('timedelta64[D]')),
+            'next_offset': offset + limit if page_hi < hi else None,
+        }
+
+    def expiring_within(self, days, today=None, offset=0, limit=500):
+        """Records expiring between today and today + days (inclusive)"""
+        today = np.datetime64(today or date.today(), 'D')
+        return self.range(today, today + np.timedelta64(days, 'D'), offset, limit)
+
+    def expired(self, today=None, offset=0, limit=500):
+        """Records whose expiry is before today"""
+        today = np.datetime64(today or date.today(), 'D')
+        return self.range(None, today - np.timedelta64(1, 'D'), offset, limit)
+
+    def __len__(self):
+        with self._lock:
+            self._reload_if_changed()
+            return len(self._ids)
@@ -0,0 +1,87 @@
+"""
+Per-prediction Feature Contributions
+Tree-path decomposition for the engine Random Forest: every split on a
+sample's path moves the predicted probability from the parent node's value
+to the child's, and that change is credited to the split feature. Averaged
+over the forest this gives
+
+    predict_proba(x) = base_value + sum(contributions(x))
+
+The per-node deltas are precomputed once per model version into a single
+(total_nodes x n_features) matrix, so explaining a batch is one sparse
+decision_path lookup and one sparse-dense matrix product.
+"""
+
+import threading
+
+import numpy as np
+
+# Explanations are reported for the AT RISK class (Engine Condition == 0)
+EXPLAINED_CLASS = 0
+
+
+class ForestExplainer:
+    """Precomputed contribution tables for one fitted forest"""
+
+    def __init__(self, model, target_class=EXPLAINED_CLASS):
+        self.model = model
+        self.n_features = model.n_features_in_
+        self.n_trees = len(model.estimators_)
+        class_index = int(np.flatnonzero(model.classes_ == target_class)[0])
+
+        node_deltas = []
+        base_values = []
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            values = tree.value[:, 0, :]
+            values = values[:, class_index] / values.sum(axis=1)
+
+            # Credit each child's change in value to its parent's split feature
+            delta = np.zeros((tree.node_count, self.n_features))
+            internal = np.flatnonzero(tree.children_left >= 0)
+            for children in (tree.children_left[internal], tree.children_right[internal]):
+                delta[children, tree.feature[internal]] = values[children] - values[internal]
+
+            node_deltas.append(delta)
+            base_values.append(values[0])
+
+        self.node_deltas = np.vstack(node_deltas)
+        self.base_value = float(np.mean(base_values))
+
+    def contributions(self, X):
+        """Return (base_value, contributions) where contributions is (n_samples, n_features)"""
+        indicator, _ = self.model.decision_path(X)
+        return self.base_value, np.asarray(indicator @ self.node_deltas) / self.n_trees
+
+
+_explainers = {}
+_explainers_lock = threading.Lock()
+
+
+def get_explainer(model, version):
+    """Cached explainer for a model version (built on first use)"""
+    key = (version, id(model))
+    explainer = _explainers.get(key)
+    if explainer is None:
+        with _explainers_lock:
+            explainer = _explainers.get(key)
+            if explainer is None:
+                explainer = ForestExplainer(model)
+                # Only the live version is worth keeping around
+                _explainers.clear()
+                _explainers[key] = explainer
+    return explainer
+
+
+def explain(model, version, X, names):
+    """Contribution dicts for each row of X, largest absolute effect first"""
+    base_value, contrib = get_explainer(model, version).contributions(X)
+    explanations = []
+    for row in contrib:
+        order = np.argsort(-np.abs(row))
+        explanations.append({
+            'base_value': round(base_value, 4),
+            'at_risk_probability': round(float(base_value + row.sum()), 4),
+            'contributions': [{'parameter': names[i], 'contribution': round(float(row[i]), 4)} for i in order]
+        })
+    return explanations
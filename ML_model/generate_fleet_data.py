@@ -0,0 +1,243 @@
+"""
+Synthetic Fleet Data Generator (load testing / capacity planning)
+Produces fuel and engine feature sets - and per-vehicle engine time series -
+in fixed-size chunks streamed to CSV or Parquet, so tens of millions of rows
+never have to sit in memory at once.
+
+Every chunk draws from its own SeedSequence(seed, spawn_key=(chunk_index,)),
+so output is identical no matter how many worker processes generate it or
+in which order chunks finish.
+
+Usage:
+    python generate_fleet_data.py fuel   --rows 20000000 --out fuel_big.parquet
+    python generate_fleet_data.py engine --rows 20000000 --out engine_big.csv --workers 8
+    python generate_fleet_data.py timeseries --vehicles 500 --steps 8640 --out telemetry.parquet
+"""
+
+import argparse
+import os
+from functools import partial
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from train_fuel_model import generate_fuel_data
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ENGINE_DATA_FILE = os.path.join(BASE_DIR, "engine_data.csv")
+
+ENGINE_FEATURES = ['Engine rpm', 'Lub oil pressure', 'Fuel pressure', 'Coolant pressure', 'lub oil temp', 'Coolant temp']
+ENGINE_TARGET = 'Engine Condition'
+
+# Relative noise added to resampled engine readings (fraction of per-class std)
+ENGINE_JITTER = 0.05
+
+
+def chunk_rng(seed, chunk_index):
+    """Independent, reproducible generator for one chunk"""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk_index,)))
+
+
+def chunk_sizes(total_rows, chunk_size):
+    """Yield (chunk_index, n_rows) covering total_rows"""
+    n_chunks = -(-total_rows // chunk_size)
+    for index in range(n_chunks):
+        yield index, min(chunk_size, total_rows - index * chunk_size)
+
+
+# ================== FUEL FEATURES ==================
+
+def fuel_chunk(seed, spec):
+    """Generate one chunk of fuel efficiency rows"""
+    index, n_rows = spec
+    return generate_fuel_data(n_rows, rng=chunk_rng(seed, index))
+
+
+# ================== ENGINE FEATURES ==================
+
+_engine_profile = None
+
+
+def load_engine_profile(path=ENGINE_DATA_FILE):
+    """Per-class reference readings and bounds taken from engine_data.csv"""
+    global _engine_profile
+    if _engine_profile is None:
+        df = pd.read_csv(path)
+        profile = {'bounds': (df[ENGINE_FEATURES].min().to_numpy(), df[ENGINE_FEATURES].max().to_numpy()),
+                   'classes': {}}
+        for label, group in df.groupby(ENGINE_TARGET):
+            values = group[ENGINE_FEATURES].to_numpy(dtype=np.float64)
+            profile['classes'][int(label)] = {
+                'prior': len(group) / len(df),
+                'values': values,
+                'std': values.std(axis=0),
+            }
+        _engine_profile = profile
+    return _engine_profile
+
+
+def engine_chunk(seed, spec):
+    """Generate one chunk of labeled engine readings.
+
+    Rows are resampled from the real dataset per class and jittered, which
+    keeps the skewed marginals and cross-feature correlations realistic
+    without fitting a model.
+    """
+    index, n_rows = spec
+    rng = chunk_rng(seed, index)
+    profile = load_engine_profile()
+    labels = np.array(sorted(profile['classes']))
+    priors = np.array([profile['classes'][label]['prior'] for label in labels])
+
+    y = rng.choice(labels, n_rows, p=priors)
+    X = np.empty((n_rows, len(ENGINE_FEATURES)))
+    for label in labels:
+        mask = y == label
+        count = int(mask.sum())
+        cls = profile['classes'][label]
+        rows = rng.integers(0, len(cls['values']), count)
+        X[mask] = cls['values'][rows] + rng.normal(0, 1, (count, len(ENGINE_FEATURES))) * cls['std'] * ENGINE_JITTER
+
+    low, high = profile['bounds']
+    np.clip(X, low, high, out=X)
+
+    df = pd.DataFrame(X, columns=ENGINE_FEATURES)
+    df['Engine rpm'] = np.round(df['Engine rpm']).astype(np.int32)
+    df[ENGINE_TARGET] = y.astype(np.int8)
+    return df
+
+
+# ================== PER-VEHICLE TIME SERIES ==================
+
+def timeseries_chunk(seed, spec, n_steps=1440, interval_s=60, start='2026-01-01', degrade_fraction=0.1):
+    """Engine telemetry for a block of vehicles, one row per vehicle per interval.
+
+    Each vehicle wanders around its own baseline (an AR(1) process); a
+    fraction of vehicles slowly drift toward at-risk readings - falling oil
+    pressure, rising temperatures and RPM - so streaming consumers see
+    realistic escalations.
+    """
+    index, n_vehicles = spec
+    rng = chunk_rng(seed, index)
+    profile = load_engine_profile()
+    healthy = profile['classes'][1]
+    low, high = profile['bounds']
+    n_features = len(ENGINE_FEATURES)
+
+    baseline = healthy['values'][rng.integers(0, len(healthy['values']), n_vehicles)]
+    scale = healthy['std'] * 0.1
+
+    # AR(1) noise around each baseline, shape (steps, vehicles, features)
+    phi = 0.9
+    shocks = rng.normal(0, 1, (n_steps, n_vehicles, n_features)) * scale
+    noise = np.empty_like(shocks)
+    noise[0] = shocks[0]
+    for t in range(1, n_steps):
+        noise[t] = phi * noise[t - 1] + shocks[t]
+
+    # Linear drift for degrading vehicles: rpm up, oil pressure down, temps up
+    degrading = rng.random(n_vehicles) < degrade_fraction
+    drift_direction = np.array([1.0, -1.0, -0.5, 0.0, 1.0, 1.0])
+    ramp = np.linspace(0, 1, n_steps)[:, None, None]
+    drift = ramp * (degrading[None, :, None] * drift_direction * healthy['std'] * 2.0)
+
+    readings = np.clip(baseline[None, :, :] + noise + drift, low, high)
+
+    timestamps = pd.date_range(start, periods=n_steps, freq=f'{interval_s}s')
+    vehicle_ids = np.array([f"V{index:04d}-{v:04d}" for v in range(n_vehicles)])
+
+    df = pd.DataFrame(readings.transpose(1, 0, 2).reshape(-1, n_features), columns=ENGINE_FEATURES)
+    df.insert(0, 'timestamp', np.tile(timestamps.values, n_vehicles))
+    df.insert(0, 'vehicle_id', np.repeat(vehicle_ids, n_steps))
+    df['Engine rpm'] = np.round(df['Engine rpm']).astype(np.int32)
+    df['degrading'] = np.repeat(degrading.astype(np.int8), n_steps)
+    return df
+
+
+# ================== STREAMED OUTPUT ==================
+
+class ChunkWriter:
+    """Append DataFrame chunks to one CSV or Parquet file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.is_parquet = path.endswith('.parquet')
+        self._parquet_writer = None
+        self._first = True
+
+    def write(self, df):
+        if self.is_parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_chunks(make_chunk, specs, workers=1):
+    """Yield chunks in order, generating them in a process pool when workers > 1"""
+    if workers <= 1:
+        for spec in specs:
+            yield make_chunk(spec)
+        return
+    with Pool(workers) as pool:
+        yield from pool.imap(make_chunk, specs)
+
+
+def write_dataset(make_chunk, specs, out_path, workers=1):
+    """Stream generated chunks to out_path, returning the number of rows written"""
+    total = 0
+    with ChunkWriter(out_path) as writer:
+        for df in iter_chunks(make_chunk, specs, workers):
+            writer.write(df)
+            total += len(df)
+            print(f"  - {total:,} rows written", end='\r')
+    print(f"\n✓ Saved {total:,} rows to {out_path}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate large synthetic fleet datasets in chunks")
+    parser.add_argument("kind", choices=["fuel", "engine", "timeseries"])
+    parser.add_argument("--out", required=True, help="output .csv or .parquet path")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="total rows (fuel/engine)")
+    parser.add_argument("--chunk-size", type=int, default=250_000, help="rows per chunk (fuel/engine)")
+    parser.add_argument("--vehicles", type=int, default=100, help="vehicles (timeseries)")
+    parser.add_argument("--steps", type=int, default=1440, help="readings per vehicle (timeseries)")
+    parser.add_argument("--interval", type=int, default=60, help="seconds between readings (timeseries)")
+    parser.add_argument("--vehicles-per-chunk", type=int, default=50, help="vehicles per chunk (timeseries)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.kind == "fuel":
+        make_chunk = partial(fuel_chunk, args.seed)
+        specs = chunk_sizes(args.rows, args.chunk_size)
+    elif args.kind == "engine":
+        make_chunk = partial(engine_chunk, args.seed)
+        specs = chunk_sizes(args.rows, args.chunk_size)
+    else:
+        make_chunk = partial(timeseries_chunk, args.seed, n_steps=args.steps, interval_s=args.interval)
+        specs = chunk_sizes(args.vehicles, args.vehicles_per_chunk)
+
+    print(f"Generating {args.kind} data → {args.out}")
+    write_dataset(make_chunk, specs, args.out, workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Engine Model Registry
+Stores versioned engine health model artifacts alongside a small JSON
+manifest. Training scripts publish new versions here and the web app
+polls the manifest to pick up the latest one without a restart.
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import joblib
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_DIR = os.path.join(BASE_DIR, "model_registry")
+MANIFEST_PATH = os.path.join(REGISTRY_DIR, "manifest.json")
+
+
+def _atomic_write(path, write_fn, suffix):
+    """Write to a temp file in the target directory, then rename over the target"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=suffix)
+    os.close(fd)
+    try:
+        write_fn(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def read_manifest():
+    """Return the current manifest dict, or None if nothing has been published"""
+    if not os.path.exists(MANIFEST_PATH):
+        return None
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def manifest_mtime():
+    """Modification time of the manifest (cheap change check for servers)"""
+    try:
+        return os.stat(MANIFEST_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def publish_model(model, feature_importance, metadata=None):
+    """Save a new model version and point the manifest at it"""
+    current = read_manifest() or {}
+    version = int(current.get("version", 0)) + 1
+
+    model_file = f"engine_health_model_v{version}.pkl"
+    importance_file = f"feature_importance_v{version}.pkl"
+
+    _atomic_write(os.path.join(REGISTRY_DIR, model_file),
+                  lambda p: joblib.dump(model, p), ".pkl")
+    _atomic_write(os.path.join(REGISTRY_DIR, importance_file),
+                  lambda p: joblib.dump(feature_importance, p), ".pkl")
+
+    manifest = dict(metadata or {})
+    manifest.update({
+        "version": version,
+        "model_file": model_file,
+        "feature_importance_file": importance_file,
+        "n_estimators": len(getattr(model, "estimators_", [])),
+        "published_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    })
+
+    def write_manifest(path):
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, indent=2)
+
+    # Manifest is written last so readers never see a version without its files
+    _atomic_write(MANIFEST_PATH, write_manifest, ".json")
+    return manifest
+
+
+def load_latest():
+    """Load (model, feature_importance, manifest) for the published version"""
+    manifest = read_manifest()
+    if manifest is None:
+        return None, None, None
+    model = joblib.load(os.path.join(REGISTRY_DIR, manifest["model_file"]))
+    feature_importance = joblib.load(os.path.join(REGISTRY_DIR, manifest["feature_importance_file"]))
+    return model, feature_importance, manifest
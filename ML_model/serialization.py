@@ -0,0 +1,124 @@
+"""
+Response Serialization
+Fast JSON (orjson when installed) plus Accept-header negotiation for
+compact binary formats:
+
+    application/json                       default
+    application/msgpack                    any response (needs msgpack)
+    application/vnd.apache.arrow.stream    tabular batch results (needs pyarrow)
+
+Formats whose library is missing are skipped during negotiation, so
+clients always get something they asked for or JSON.
+"""
+
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+ARROW = 'application/vnd.apache.arrow.stream'
+
+# Accepted aliases for the same formats
+_ALIASES = {
+    'application/x-msgpack': MSGPACK,
+    'application/vnd.msgpack': MSGPACK,
+    'application/vnd.apache.arrow.file': ARROW,
+}
+
+
+def dumps_json(obj, sort_keys=False):
+    """Serialize to JSON bytes, using orjson when available"""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, ensure_ascii=False, sort_keys=sort_keys, separators=(',', ':')).encode()
+
+
+def loads_json(data):
+    """Parse JSON bytes/str, using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (falls back to the stdlib encoder)"""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        return dumps_json(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys)).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return loads_json(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_json(obj, sort_keys=self.sort_keys), mimetype=self.mimetype)
+
+
+def negotiate(accept, tabular=False):
+    """Pick the response media type for an Accept header value"""
+    available = {JSON}
+    if msgpack is not None:
+        available.add(MSGPACK)
+    if tabular and pa is not None:
+        available.add(ARROW)
+
+    best, best_q = JSON, 0.0
+    for part in (accept or '').split(','):
+        fields = part.strip().split(';')
+        media = _ALIASES.get(fields[0].strip().lower(), fields[0].strip().lower())
+        q = 1.0
+        for param in fields[1:]:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        # JSON wins ties so "*/*" and unknown types keep the default
+        if media in available and (q > best_q or (q == best_q and media == JSON)):
+            best, best_q = media, q
+    return best
+
+
+def encode(body, accept, table=None):
+    """Encode a response body for the client's Accept header.
+
+    `table` is an optional zero-argument callable returning a pyarrow.Table
+    of the same data, used only when Arrow is negotiated.
+    Returns (payload_bytes, media_type).
+    """
+    media = negotiate(accept, tabular=table is not None)
+    if media == MSGPACK:
+        return msgpack.packb(body, use_bin_type=True), MSGPACK
+    if media == ARROW:
+        sink = pa.BufferOutputStream()
+        arrow_table = table()
+        with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+            writer.write_table(arrow_table)
+        return sink.getvalue().to_pybytes(), ARROW
+    return dumps_json(body), JSON
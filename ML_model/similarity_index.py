@@ -0,0 +1,219 @@
+"""
+Fleet-wide Similar Readings Index
+KD-tree over standardized engine features built from engine_data.csv plus
+the labeled batches in telemetry_store/. Used by /similar to answer "which
+past readings looked like this and what happened".
+
+The first tree is built in a background thread when the server starts.
+Batches the training job writes later are indexed incrementally: only the
+new files are read, into a small delta tree that shares the base tree's
+scaling, and queries merge the nearest neighbours of both. Once the delta
+outgrows DELTA_REBUILD_FRACTION of the base, the whole index is rebuilt
+in the background. Every change is swapped in atomically, so queries never
+wait on an update.
+"""
+
+import glob
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DATA_FILE = os.path.join(BASE_DIR, "engine_data.csv")
+TELEMETRY_STORE_DIR = os.path.join(BASE_DIR, "telemetry_store")
+
+FEATURES = ['Engine rpm', 'Lub oil pressure', 'Fuel pressure', 'Coolant pressure', 'lub oil temp', 'Coolant temp']
+TARGET = 'Engine Condition'
+
+BATCH_CHECK_INTERVAL_S = 30
+# Full rebuild (fresh scaling, one tree) once the delta holds this share of the base rows
+DELTA_REBUILD_FRACTION = 0.1
+
+
+class IndexNotReady(RuntimeError):
+    """The first snapshot is still being built"""
+
+
+class _Part:
+    """KD-tree over one block of readings, standardized with the index's scaling"""
+
+    def __init__(self, X, y, sources, rows, mean, std):
+        self.tree = KDTree((X - mean) / std)
+        self.X = X
+        self.y = y
+        self.sources = sources
+        self.rows = rows
+
+
+class _Snapshot:
+    """Immutable base tree plus an optional delta tree of later batches"""
+
+    def __init__(self, base, delta, mean, std, source_names, batches):
+        self.base = base
+        self.delta = delta
+        self.mean = mean
+        self.std = std
+        self.source_names = source_names
+        self.batches = batches
+        self.built_at = time.time()
+
+    @property
+    def parts(self):
+        return [self.base] if self.delta is None else [self.base, self.delta]
+
+    def __len__(self):
+        return sum(len(part.y) for part in self.parts)
+
+
+def _list_batches():
+    return sorted(os.path.basename(p) for p in glob.glob(os.path.join(TELEMETRY_STORE_DIR, "batch_*.parquet")))
+
+
+def _load_batch(name):
+    return pd.read_parquet(os.path.join(TELEMETRY_STORE_DIR, name), columns=FEATURES + [TARGET])
+
+
+def _stack(frames, first_source):
+    """Feature matrix, labels, source ids and row numbers for a list of frames"""
+    X = np.concatenate([f[FEATURES].to_numpy(dtype=np.float64) for f in frames])
+    y = np.concatenate([f[TARGET].to_numpy(dtype=np.int8) for f in frames])
+    sources = np.concatenate([np.full(len(f), first_source + i, dtype=np.int32) for i, f in enumerate(frames)])
+    rows = np.concatenate([np.arange(len(f), dtype=np.int64) for f in frames])
+    return X, y, sources, rows
+
+
+def _build_snapshot():
+    """Load the base dataset and every stored batch, then build the tree"""
+    frames = [pd.read_csv(BASE_DATA_FILE)[FEATURES + [TARGET]]]
+    source_names = [os.path.basename(BASE_DATA_FILE)]
+    batches = _list_batches()
+    for name in batches:
+        frames.append(_load_batch(name))
+        source_names.append(name)
+
+    X, y, sources, rows = _stack(frames, 0)
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    std[std == 0] = 1.0
+    return _Snapshot(_Part(X, y, sources, rows, mean, std), None, mean, std, source_names, set(batches))
+
+
+def _extend_snapshot(snapshot, names):
+    """New snapshot with `names` added to the delta tree; the base tree is shared"""
+    frames = [_load_batch(name) for name in names]
+    X, y, sources, rows = _stack(frames, len(snapshot.source_names))
+    if snapshot.delta is not None:
+        delta = snapshot.delta
+        X, y = np.concatenate([delta.X, X]), np.concatenate([delta.y, y])
+        sources, rows = np.concatenate([delta.sources, sources]), np.concatenate([delta.rows, rows])
+    return _Snapshot(snapshot.base, _Part(X, y, sources, rows, snapshot.mean, snapshot.std),
+                     snapshot.mean, snapshot.std, snapshot.source_names + list(names),
+                     snapshot.batches | set(names))
+
+
+class SimilarityIndex:
+    """Thread-safe nearest-neighbour index with non-blocking updates"""
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._rebuild_thread = None
+        self._last_batch_check = 0.0
+
+    def _start(self, target):
+        """Run an update in the background; returns False if one is already running"""
+        with self._lock:
+            if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+                return False
+            self._rebuild_thread = threading.Thread(target=target, daemon=True)
+            self._rebuild_thread.start()
+            return True
+
+    def rebuild_async(self):
+        """Rebuild the whole index in the background; returns False if an update is running"""
+        return self._start(self._rebuild)
+
+    def _rebuild(self):
+        try:
+            snapshot = _build_snapshot()
+            with self._lock:
+                self._snapshot = snapshot
+            print(f"[SIMILAR] Index built: {len(snapshot)} readings")
+        except Exception as error:
+            print(f"[SIMILAR] Index build failed: {error}")
+
+    def _add_batches(self):
+        try:
+            with self._lock:
+                snapshot = self._snapshot
+            names = sorted(set(_list_batches()) - snapshot.batches)
+            if not names:
+                return
+            extended = _extend_snapshot(snapshot, names)
+            with self._lock:
+                if self._snapshot is not snapshot:
+                    return
+                self._snapshot = extended
+            print(f"[SIMILAR] Indexed {len(names)} new batch(es): "
+                  f"{len(extended.delta.y)} readings in the delta tree")
+        except Exception as error:
+            print(f"[SIMILAR] Adding batches failed: {error}")
+
+    def _check_new_batches(self, snapshot):
+        """Periodically pick up telemetry_store batches written by the training job"""
+        now = time.time()
+        if now - self._last_batch_check < BATCH_CHECK_INTERVAL_S:
+            return
+        self._last_batch_check = now
+        if not set(_list_batches()) - snapshot.batches:
+            return
+        delta_rows = 0 if snapshot.delta is None else len(snapshot.delta.y)
+        if delta_rows > DELTA_REBUILD_FRACTION * len(snapshot.base.y):
+            self.rebuild_async()
+        else:
+            self._start(self._add_batches)
+
+    def query(self, readings, k=5):
+        """k nearest stored readings for each row of `readings`.
+
+        Returns (distances, labels, sources, rows, features), each with a
+        leading dimension of len(readings). Raises IndexNotReady until the
+        first snapshot has been built.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.rebuild_async()
+            raise IndexNotReady("Similarity index is still being built")
+        self._check_new_batches(snapshot)
+
+        Q = np.asarray(readings, dtype=np.float64).reshape(-1, len(FEATURES))
+        Qs = (Q - snapshot.mean) / snapshot.std
+        found = []
+        for part in snapshot.parts:
+            dist, idx = part.tree.query(Qs, k=min(k, len(part.y)))
+            found.append((dist, part.y[idx], part.sources[idx], part.rows[idx], part.X[idx]))
+
+        dist, labels, sources, rows, features = (np.concatenate(arrays, axis=1) for arrays in zip(*found))
+        if len(found) > 1:
+            order = np.argsort(dist, axis=1, kind='stable')[:, :k]
+            dist, labels, sources, rows = (np.take_along_axis(a, order, axis=1)
+                                           for a in (dist, labels, sources, rows))
+            features = np.take_along_axis(features, order[:, :, None], axis=1)
+
+        return dist, labels, np.array(snapshot.source_names, dtype=object)[sources], rows, features
+
+    def stats(self):
+        """Size and freshness of the current index"""
+        with self._lock:
+            snapshot = self._snapshot
+            rebuilding = self._rebuild_thread is not None and self._rebuild_thread.is_alive()
+        return {
+            'indexed_readings': 0 if snapshot is None else len(snapshot),
+            'delta_readings': 0 if snapshot is None or snapshot.delta is None else int(len(snapshot.delta.y)),
+            'rebuilding': rebuilding,
+            'built_at': None if snapshot is None else snapshot.built_at,
+        }
@@ -0,0 +1,246 @@
+"""
+Incremental Engine Health Model Training
+Appends newly labeled field readings to a columnar (Parquet) telemetry store
+and grows the existing Random Forest with warm-start instead of refitting
+from scratch. The trees of the full fit are never dropped, batches smaller
+than --min-rows wait for more data, and a grown forest is only published
+via model_registry when it scores at least as well as the current model on
+readings held out from the new data.
+
+Usage:
+    python train_engine_incremental.py new_readings.csv [more.csv ...]
+    python train_engine_incremental.py --new-trees 40 --max-trees 400 --min-rows 500
+"""
+
+import argparse
+import glob
+import os
+from datetime import datetime, timezone
+
+import joblib
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.utils.class_weight import compute_class_weight
+
+import model_registry
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DATA_FILE = os.path.join(BASE_DIR, "engine_data.csv")
+TELEMETRY_STORE_DIR = os.path.join(BASE_DIR, "telemetry_store")
+LEGACY_MODEL_FILE = os.path.join(BASE_DIR, "engine_health_model.pkl")
+
+FEATURES = ['Engine rpm', 'Lub oil pressure', 'Fuel pressure', 'Coolant pressure', 'lub oil temp', 'Coolant temp']
+TARGET = 'Engine Condition'
+# Pending batches are merged until they hold this many rows, so new trees are
+# never fit on a handful of readings and the 20% holdout means something
+MIN_BATCH_ROWS = 200
+# Rows replayed per class that the new data and replay sample both lack
+MIN_CLASS_ROWS = 10
+
+
+def append_batch(df):
+    """Validate a labeled batch and append it to the telemetry store as a Parquet part"""
+    missing = [col for col in FEATURES + [TARGET] if col not in df.columns]
+    if missing:
+        raise ValueError(f"Batch is missing columns: {missing}")
+
+    batch = df[FEATURES + [TARGET]].dropna()
+    batch = batch.astype({col: 'float32' for col in FEATURES})
+    batch[TARGET] = batch[TARGET].astype('int8')
+    if not batch[TARGET].isin([0, 1]).all():
+        raise ValueError(f"'{TARGET}' must be 0 or 1")
+
+    os.makedirs(TELEMETRY_STORE_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+    path = os.path.join(TELEMETRY_STORE_DIR, f"batch_{stamp}.parquet")
+    batch.to_parquet(path, index=False)
+    print(f"✓ Appended {len(batch)} labeled readings → {os.path.basename(path)}")
+    return path
+
+
+def list_batches():
+    """Return all batch files in the store, oldest first"""
+    return sorted(os.path.basename(p) for p in glob.glob(os.path.join(TELEMETRY_STORE_DIR, "batch_*.parquet")))
+
+
+def load_batches(names):
+    """Read the given batch files into one DataFrame"""
+    if not names:
+        empty = {col: pd.Series(dtype='float32') for col in FEATURES}
+        empty[TARGET] = pd.Series(dtype='int8')
+        return pd.DataFrame(empty)
+    frames = [pd.read_parquet(os.path.join(TELEMETRY_STORE_DIR, name), columns=FEATURES + [TARGET]) for name in names]
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_initial_model(df, n_estimators=200):
+    """Full fit used only when no model has been published yet"""
+    model = RandomForestClassifier(
+        n_estimators=n_estimators,
+        max_depth=15,
+        min_samples_split=5,
+        random_state=42,
+        class_weight="balanced",
+        n_jobs=-1
+    )
+    model.fit(df[FEATURES], df[TARGET])
+    return model
+
+
+def load_current_model():
+    """Latest registry version, falling back to the bundled pickle"""
+    model, _, manifest = model_registry.load_latest()
+    if model is not None:
+        return model, manifest
+    if os.path.exists(LEGACY_MODEL_FILE):
+        return joblib.load(LEGACY_MODEL_FILE), None
+    return None, None
+
+
+def grow_forest(model, new_data, replay_data, all_labels, new_trees=50, max_trees=400, seed=None, base_trees=0):
+    """Add `new_trees` trees fit on fresh data plus a replay sample of history.
+
+    Existing trees are kept untouched; when the forest exceeds `max_trees` the
+    oldest incremental trees are dropped so prediction latency stays bounded.
+    The first `base_trees` trees come from the full fit and are never dropped.
+    Class weights are fixed from `all_labels` so the new trees stay balanced
+    like the old ones.
+    """
+    if base_trees + new_trees > max_trees:
+        raise ValueError(f"max_trees={max_trees} leaves no room for {new_trees} new trees "
+                         f"next to the {base_trees} trees of the full fit")
+    train_df = pd.concat([new_data, replay_data], ignore_index=True)
+    missing = set(model.classes_.tolist()) - set(train_df[TARGET].tolist())
+    if missing:
+        # Trees fit without a class would not line up with the existing ones at predict time
+        raise ValueError(f"New trees need every class in their training data; missing {sorted(missing)}")
+    weights = compute_class_weight("balanced", classes=model.classes_, y=all_labels)
+
+    model.set_params(
+        warm_start=True,
+        n_estimators=len(model.estimators_) + new_trees,
+        class_weight=dict(zip(model.classes_.tolist(), weights)),
+        random_state=seed,
+    )
+    model.fit(train_df[FEATURES], train_df[TARGET])
+
+    if len(model.estimators_) > max_trees:
+        dropped = len(model.estimators_) - max_trees
+        model.estimators_ = model.estimators_[:base_trees] + model.estimators_[base_trees + dropped:]
+        model.n_estimators = max_trees
+        print(f"  - Dropped {dropped} oldest incremental trees (max_trees={max_trees})")
+
+    return model
+
+
+def train_incremental(new_trees=50, max_trees=400, replay_ratio=1.0, seed=None,
+                      min_rows=MIN_BATCH_ROWS, max_accuracy_drop=0.0):
+    """Consume unseen batches from the store and publish a new model version.
+
+    Returns the new manifest, or None when nothing was published.
+    """
+    manifest = model_registry.read_manifest() or {}
+    consumed = set(manifest.get("consumed_batches", []))
+    pending = [name for name in list_batches() if name not in consumed]
+
+    model, _ = load_current_model()
+    # Registry versions from before base_trees was recorded, and the bundled
+    # pickle, protect every tree they already have
+    base_trees = manifest.get("base_trees", len(getattr(model, "estimators_", [])))
+    history = pd.read_csv(BASE_DATA_FILE)[FEATURES + [TARGET]]
+    history = pd.concat([history, load_batches(sorted(consumed))], ignore_index=True)
+
+    if model is None:
+        print("⏳ No published model found - running initial full fit...")
+        model = build_initial_model(pd.concat([history, load_batches(pending)], ignore_index=True))
+        base_trees = len(model.estimators_)
+        holdout_accuracy = None
+    else:
+        if not pending:
+            print("✓ No new labeled batches - nothing to do")
+            return None
+
+        new_data = load_batches(pending)
+        min_rows = max(min_rows, MIN_CLASS_ROWS)
+        if len(new_data) < min_rows:
+            print(f"✓ Only {len(new_data)} new readings in {len(pending)} batch(es) - waiting for "
+                  f"{min_rows} before growing the forest")
+            return None
+
+        class_counts = new_data[TARGET].value_counts()
+        new_data, holdout = train_test_split(
+            new_data, test_size=0.2, random_state=42,
+            stratify=new_data[TARGET] if len(class_counts) > 1 and class_counts.min() >= 2 else None
+        )
+        n_replay = min(len(history), int(len(new_data) * replay_ratio))
+        replay = history.sample(n=n_replay, random_state=seed) if n_replay else history.iloc[:0]
+        # Small batches may hold a single class; replay a few rows of any class they lack
+        for label in set(model.classes_.tolist()) - set(new_data[TARGET]) - set(replay[TARGET]):
+            rows = history[history[TARGET] == label]
+            replay = pd.concat([replay, rows.sample(n=min(len(rows), MIN_CLASS_ROWS), random_state=seed)],
+                               ignore_index=True)
+
+        before = accuracy_score(holdout[TARGET], model.predict(holdout[FEATURES]))
+        print(f"⏳ Growing forest: {len(model.estimators_)} trees + {new_trees} "
+              f"on {len(new_data)} new / {len(replay)} replayed readings...")
+        all_labels = pd.concat([history[TARGET], new_data[TARGET]], ignore_index=True)
+        model = grow_forest(model, new_data, replay, all_labels,
+                            new_trees=new_trees, max_trees=max_trees, seed=seed, base_trees=base_trees)
+        after = accuracy_score(holdout[TARGET], model.predict(holdout[FEATURES]))
+        print(f"  - Holdout accuracy on new readings: {before:.4f} → {after:.4f}")
+        if after < before - max_accuracy_drop:
+            # The batches stay pending, so the next run retries them together with newer data
+            print(f"✗ Not published: holdout accuracy fell by more than {max_accuracy_drop:.4f} "
+                  f"versus the current model")
+            return None
+        holdout_accuracy = round(float(after), 4)
+
+    feature_importance = pd.DataFrame({
+        'Feature': FEATURES,
+        'Importance': model.feature_importances_
+    }).sort_values('Importance', ascending=False)
+
+    published = model_registry.publish_model(model, feature_importance, {
+        "consumed_batches": sorted(consumed | set(pending)),
+        "new_batches": pending,
+        "holdout_accuracy": holdout_accuracy,
+        "base_trees": base_trees,
+    })
+    print(f"✓ Published engine model v{published['version']} ({published['n_estimators']} trees)")
+    return published
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append labeled engine readings and warm-start the model")
+    parser.add_argument("batches", nargs="*", help="CSV/Parquet files of newly labeled readings")
+    parser.add_argument("--new-trees", type=int, default=50, help="trees added per run")
+    parser.add_argument("--max-trees", type=int, default=400,
+                        help="cap on forest size (oldest incremental trees dropped, full-fit trees kept)")
+    parser.add_argument("--min-rows", type=int, default=MIN_BATCH_ROWS,
+                        help="new readings needed before the forest is grown; smaller batches wait")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.0,
+                        help="largest holdout accuracy loss versus the current model that is still published")
+    parser.add_argument("--replay-ratio", type=float, default=1.0,
+                        help="historical rows replayed per new row when fitting new trees")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    print("="*60)
+    print("ENGINE HEALTH MODEL - INCREMENTAL TRAINING")
+    print("="*60)
+
+    for path in args.batches:
+        df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+        append_batch(df)
+
+    published = train_incremental(new_trees=args.new_trees, max_trees=args.max_trees,
+                                  replay_ratio=args.replay_ratio, seed=args.seed,
+                                  min_rows=args.min_rows, max_accuracy_drop=args.max_accuracy_drop)
+    if published is None:
+        print("No new model version published")
+
+
+if __name__ == '__main__':
+    main()
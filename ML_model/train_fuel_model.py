@@ -12,20 +12,26 @@ from sklearn.metrics import mean_absolute_error, r2_score
 import joblib
 import os
 
-def generate_fuel_data(n_samples=5000):
-    """Generate realistic synthetic fuel efficiency data for fleet vehicles"""
-    np.random.seed(42)
+def generate_fuel_data(n_samples=5000, rng=None):
+    """Generate realistic synthetic fuel efficiency data for fleet vehicles
+
+    Pass a numpy Generator as `rng` to draw an independent chunk (see
+    generate_fleet_data.py); by default the legacy fixed seed is used.
+    """
+    if rng is None:
+        np.random.seed(42)
+        rng = np.random
     
     # Features
-    vehicle_age = np.random.uniform(0, 15, n_samples)  # years
-    odometer = vehicle_age * np.random.uniform(15000, 40000, n_samples)  # km
-    engine_hours = vehicle_age * np.random.uniform(300, 800, n_samples)  # hours
-    load_factor = np.random.uniform(0.2, 1.0, n_samples)  # fraction of max capacity
-    avg_speed = np.random.uniform(20, 80, n_samples)  # km/h
-    idle_time_pct = np.random.uniform(5, 40, n_samples)  # % of total time idling
-    tire_pressure_ok = np.random.choice([0, 1], n_samples, p=[0.2, 0.8])
-    ac_usage = np.random.choice([0, 1], n_samples, p=[0.4, 0.6])
-    maintenance_score = np.random.uniform(40, 100, n_samples)  # maintenance compliance
+    vehicle_age = rng.uniform(0, 15, n_samples)  # years
+    odometer = vehicle_age * rng.uniform(15000, 40000, n_samples)  # km
+    engine_hours = vehicle_age * rng.uniform(300, 800, n_samples)  # hours
+    load_factor = rng.uniform(0.2, 1.0, n_samples)  # fraction of max capacity
+    avg_speed = rng.uniform(20, 80, n_samples)  # km/h
+    idle_time_pct = rng.uniform(5, 40, n_samples)  # % of total time idling
+    tire_pressure_ok = rng.choice([0, 1], n_samples, p=[0.2, 0.8])
+    ac_usage = rng.choice([0, 1], n_samples, p=[0.4, 0.6])
+    maintenance_score = rng.uniform(40, 100, n_samples)  # maintenance compliance
     
     # Base efficiency (km/l) - typical for fleet trucks/vehicles
     base_efficiency = 8.0
@@ -40,7 +46,7 @@ def generate_fuel_data(n_samples=5000):
         + tire_pressure_ok * 0.4 \
         - ac_usage * 0.3 \
         + maintenance_score * 0.02 \
-        + np.random.normal(0, 0.5, n_samples)  # noise
+        + rng.normal(0, 0.5, n_samples)  # noise
     
     efficiency = np.clip(efficiency, 2.0, 14.0)
     
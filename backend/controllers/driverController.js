@@ -12,6 +12,14 @@ const ML_SERVICE_URL = (
     (process.env.NODE_ENV === 'production' ? DEFAULT_PROD_ML_URL : DEFAULT_LOCAL_ML_URL)
 ).replace(/\/+$/, '');
 
+// Service key listed in the ML service's API_KEYS. When set, requests carry the
+// user's id so the ML service's per-client limits apply per user, not to the
+// whole fleet sharing this backend's IP.
+const ML_API_KEY = process.env.ML_API_KEY;
+const mlClientHeaders = (req) => (
+    ML_API_KEY ? { 'X-API-Key': ML_API_KEY, 'X-Client-Id': String(req.user._id) } : {}
+);
+
 // @desc    Extract license number from image/PDF using ML OCR
 // @route   POST /api/drivers/extract-license
 exports.extractLicense = async (req, res) => {
@@ -36,7 +44,8 @@ exports.extractLicense = async (req, res) => {
             formData,
             {
                 headers: {
-                    ...formData.getHeaders()
+                    ...formData.getHeaders(),
+                    ...mlClientHeaders(req)
                 },
                 timeout: 180000 // 180 second timeout for OCR processing (first run may download models)
             }
@@ -75,6 +84,17 @@ exports.extractLicense = async (req, res) => {
             });
         }
         
+        // Rate limited, busy or too large: pass the ML service's answer through
+        if ([413, 429, 503].includes(err.response?.status)) {
+            if (err.response.headers['retry-after']) {
+                res.set('Retry-After', err.response.headers['retry-after']);
+            }
+            return res.status(err.response.status).json({
+                success: false,
+                message: err.response.data?.error || 'ML service is busy. Please try again shortly.'
+            });
+        }
+
         res.status(500).json({
             success: false,
             message: err.response?.data?.error || err.message
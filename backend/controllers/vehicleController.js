@@ -12,6 +12,14 @@ const ML_SERVICE_URL = (
     (process.env.NODE_ENV === 'production' ? DEFAULT_PROD_ML_URL : DEFAULT_LOCAL_ML_URL)
 ).replace(/\/+$/, '');
 
+// Service key listed in the ML service's API_KEYS. When set, requests carry the
+// user's id so the ML service's per-client limits apply per user, not to the
+// whole fleet sharing this backend's IP.
+const ML_API_KEY = process.env.ML_API_KEY;
+const mlClientHeaders = (req) => (
+    ML_API_KEY ? { 'X-API-Key': ML_API_KEY, 'X-Client-Id': String(req.user._id) } : {}
+);
+
 // @desc    Get all vehicles
 // @route   GET /api/vehicles
 exports.getVehicles = async (req, res) => {
@@ -390,7 +398,7 @@ exports.predictEngineHealth = async (req, res) => {
 
         const response = await axios.post(`${ML_SERVICE_URL}/predict`, {
             rpm, oil_pressure, fuel_pressure, coolant_pressure, oil_temp, coolant_temp
-        }, { timeout: 15000 });
+        }, { timeout: 15000, headers: mlClientHeaders(req) });
 
         // Save prediction result to vehicle using updateOne for reliability
         const predictionData = {
@@ -443,6 +451,16 @@ exports.predictEngineHealth = async (req, res) => {
                 message: `ML service timed out at ${ML_SERVICE_URL}. Please try again.`
             });
         }
+        // Rate limited, busy or too large: pass the ML service's answer through
+        if ([413, 429, 503].includes(err.response?.status)) {
+            if (err.response.headers['retry-after']) {
+                res.set('Retry-After', err.response.headers['retry-after']);
+            }
+            return res.status(err.response.status).json({
+                success: false,
+                message: err.response.data?.error || 'ML service is busy. Please try again shortly.'
+            });
+        }
         console.error('Prediction error:', err.message);
         res.status(500).json({ success: false, message: err.message });
     }